@@ -12,6 +12,8 @@ from routes.inpaint_router import inpaint_bp
 from routes.reinsert_router import reinsert_bp
 from routes.ocr_router import ocr_bp
 from routes.prefix_router import signed_bp
+from routes.job_router import job_bp
+from routes.render_router import render_bp
 
 print("S3_BUCKET =", os.getenv("S3_BUCKET"))
 
@@ -35,6 +37,8 @@ app.register_blueprint(reinsert_bp)
 app.register_blueprint(ocr_bp, url_prefix="/api/ocr")
 app.register_blueprint(font_bp, url_prefix="/api/font-recommend")
 app.register_blueprint(signed_bp)
+app.register_blueprint(job_bp)
+app.register_blueprint(render_bp)
 
 
 
@@ -1,6 +1,6 @@
 # routes/font_router.py
 from flask import Blueprint, request, jsonify
-from services.font_service import process_font_recommend
+from services.font_service import process_font_recommend, FONT_GRANULARITIES
 
 font_bp = Blueprint("font", __name__)
 
@@ -10,6 +10,10 @@ def font_recommend():
     data = request.get_json()
     project_id = data.get("projectId")   # 지금 로직에선 안 써도 됨
     image_url = data["image_url"]
+    granularity = data.get("granularity", "page")   # "page" | "line" | "block"
 
-    result = process_font_recommend(project_id, image_url)
+    if granularity not in FONT_GRANULARITIES:
+        return jsonify({"message": f"granularity must be one of {', '.join(FONT_GRANULARITIES)}"}), 400
+
+    result = process_font_recommend(project_id, image_url, granularity)
     return jsonify(result)
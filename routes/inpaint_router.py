@@ -14,12 +14,14 @@ def inpaint():
         if not original_url or not mask_url:
             return jsonify({"message": "image_url, mask_url required"}), 400
 
-        output_url = inpaint_image(original_url, mask_url)
+        output_url = inpaint_image(original_url, mask_url, data.get("mode"))
 
         return jsonify({
             "message": "success",
             "output_url": output_url
         }), 200
 
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         return jsonify({"message": str(e)}), 500
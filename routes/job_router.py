@@ -0,0 +1,55 @@
+from flask import Blueprint, request, jsonify
+from services.job_service import job_queue, JobError
+
+job_bp = Blueprint("job", __name__, url_prefix="/api/jobs")
+
+
+# POST /api/jobs  { "type": "inpaint" | "ocr_auto" | "font_recommend", "params": {...}, "priority": 0 }
+@job_bp.route("", methods=["POST"])
+def submit_job():
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({"message": "body must be an object"}), 400
+    job_type = data.get("type")
+    params = data.get("params") or {}
+
+    if not job_type:
+        return jsonify({"message": "type is required"}), 400
+    if not isinstance(params, dict):
+        return jsonify({"message": "params must be an object"}), 400
+
+    try:
+        priority = int(data.get("priority", 0))
+        job = job_queue.submit(job_type, params, priority)
+    except (JobError, ValueError) as e:
+        return jsonify({"message": str(e)}), 400
+
+    return jsonify({"job_id": job.id, "status": job.status}), 202
+
+
+# GET /api/jobs/<job_id>?wait=10  (wait > 0 이면 끝날 때까지 최대 wait초 long-poll)
+@job_bp.route("/<job_id>", methods=["GET"])
+def job_status(job_id):
+    wait = request.args.get("wait", 0, type=float)
+    job = job_queue.wait(job_id, wait)
+
+    if job is None:
+        return jsonify({"message": "job not found"}), 404
+
+    return jsonify(job.to_dict(with_result=False)), 200
+
+
+# GET /api/jobs/<job_id>/result
+@job_bp.route("/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    wait = request.args.get("wait", 0, type=float)
+    job = job_queue.wait(job_id, wait)
+
+    if job is None:
+        return jsonify({"message": "job not found"}), 404
+    if job.status == "failed":
+        return jsonify(job.to_dict()), 500
+    if job.status != "done":
+        return jsonify(job.to_dict()), 202
+
+    return jsonify(job.to_dict()), 200
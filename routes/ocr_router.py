@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify, send_file
-from services.ocr_service import process_ocr
+import json
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
+from services.ocr_service import process_ocr, process_ocr_batch, ocr_dedup_stats
 from services.ocr_service import process_ocr_select, download_ocr_json_file
 
 ocr_bp = Blueprint("ocr", __name__)
@@ -14,6 +15,36 @@ def ocr_auto():
     return jsonify(result)
 
 
+@ocr_bp.post("/batch")
+def ocr_batch():
+    """
+    에피소드 단위 OCR. Body: {"projectId", "image_urls": [...]}
+    페이지가 끝나는 순서대로 한 줄씩 NDJSON으로 내려보내고, 마지막 줄은 {"done": true, ...}
+    """
+    data = request.get_json()
+    projectId = data.get("projectId")
+    image_urls = data.get("image_urls") or []
+
+    if not isinstance(image_urls, list) or not image_urls:
+        return jsonify({"message": "image_urls required"}), 400
+
+    def generate():
+        failed = 0
+        for result in process_ocr_batch(projectId, image_urls):
+            if "error" in result:
+                failed += 1
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "count": len(image_urls), "failed": failed}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@ocr_bp.get("/dedup-stats")
+def ocr_dedup_stats_route():
+    """같은 이미지 바이트라서 Vision 없이 결과를 복사한 횟수 (hits / misses / hit_rate)"""
+    return jsonify(ocr_dedup_stats()), 200
+
+
 @ocr_bp.post("/select")
 def ocr_select():
     data = request.get_json()
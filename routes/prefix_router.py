@@ -1,19 +1,10 @@
 from flask import Blueprint, request, jsonify
-import os
-import boto3
-import json
-from dotenv import load_dotenv
-load_dotenv()
+from utils.s3_client import get_s3_client, extract_s3_key, S3_BUCKET
 
 signed_bp = Blueprint("prefix", __name__, url_prefix="/api/prefix")
 
-# 🔥 s3 클라이언트 생성 (여기 추가해야 함)
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-    region_name=os.getenv("AWS_REGION")
-)
+# 공용 s3 클라이언트
+s3 = get_s3_client()
 
 @signed_bp.route("", methods=["POST"])
 def get_signed_url():
@@ -26,11 +17,11 @@ def get_signed_url():
     # URL에서 key 추출
     # 예: https://bucket.s3.amazonaws.com/output/xxx.png → output/xxx.png
     try:
-        key = url.split(".amazonaws.com/")[1]
+        key = extract_s3_key(url)
     except:
         return jsonify({"message": "Invalid S3 URL format"}), 400
 
-    bucket = os.getenv("S3_BUCKET")
+    bucket = S3_BUCKET
 
     try:
         signed_url = s3.generate_presigned_url(
@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify
+from services.render_service import render_page
+
+render_bp = Blueprint("render", __name__, url_prefix="/api/render")
+
+
+@render_bp.route("", methods=["POST"])
+def render():
+    try:
+        data = request.get_json()
+
+        image_url = data.get("image_url")
+        if not image_url:
+            return jsonify({"message": "image_url required"}), 400
+
+        output_url = render_page(
+            image_url,
+            boxes=data.get("boxes"),
+            ocr_json_url=data.get("ocr_json_url"),
+            translated_json_url=data.get("translated_json_url"),
+            fmt=data.get("format", "png")
+        )
+
+        return jsonify({
+            "message": "success",
+            "output_url": output_url
+        }), 200
+
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from services.translate_service import process_translation
-from utils.papago import papago_translate
+from utils.papago import papago_translate, translation_cache_stats
 
 translate_bp = Blueprint("translate", __name__, url_prefix="/api/translate")
 
@@ -39,4 +39,8 @@ def translate_text():
         }), 200
 
     except Exception as e:
-        return jsonify({"message": str(e)}), 500
\ No newline at end of file
+        return jsonify({"message": str(e)}), 500
+
+@translate_bp.route("/cache-stats", methods=["GET"])
+def translate_cache_stats():
+    return jsonify(translation_cache_stats()), 200
@@ -0,0 +1,87 @@
+"""
+폰트 임베딩 추출 벤치마크 (CPU): 한 장씩(기존 방식) vs services.font_model.embed_images 배치.
+
+    python -m scripts.bench_font_embedding --images 256 --batch 16 32 64
+    python -m scripts.bench_font_embedding --checkpoint   # 실제 체크포인트 가중치 사용
+    python -m scripts.bench_font_embedding --runtime int8 --threads 4   # export 한 양자화 모델 (scripts.export_font_model)
+
+크기가 제각각인 가짜 텍스트 crop 으로 images/sec 를 재고, 두 방식의 임베딩 차이(최대 절댓값)도 출력한다.
+"""
+import time
+import random
+import argparse
+
+import numpy as np
+import torch
+import torchvision.transforms as T
+from PIL import Image
+
+import services.font_model as fm
+
+
+def make_crops(n, seed=0):
+    rnd = random.Random(seed)
+    rng = np.random.default_rng(seed)
+    crops = []
+    for _ in range(n):
+        w, h = rnd.randint(60, 400), rnd.randint(30, 200)
+        crops.append(Image.fromarray(rng.integers(0, 256, (h, w), dtype=np.uint8), "L"))
+    return crops
+
+
+def embed_one_by_one(model, images, device):
+    """기존 방식: 매번 transform 생성 + 1장씩 forward"""
+    out = []
+    with torch.no_grad():
+        for img in images:
+            img_t = T.ToTensor()(img.convert("L")).repeat(3, 1, 1)
+            img_t = T.Resize((128, 128))(img_t).unsqueeze(0).to(device)
+            emb, _ = model(img_t)
+            out.append(emb.squeeze(0))
+    return torch.stack(out, dim=0)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--batch", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--checkpoint", action="store_true")
+    parser.add_argument("--runtime", choices=fm.FONT_RUNTIMES, default="float")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # 양자화 모델은 CPU 전용, 기준(one-by-one)은 같은 체크포인트의 float 모델
+    device = torch.device("cpu") if args.runtime != "float" else fm.device
+    if args.runtime != "float":
+        checkpoint, checkpoint_sha = fm.load_checkpoint(device=device)
+        base = fm.load_font_model(checkpoint, device=device)
+        model = fm.load_runtime_model(base, checkpoint_sha, args.runtime, device=device)
+    elif args.checkpoint:
+        model = base = fm.load_font_model(fm.load_checkpoint(device=device)[0], device=device)
+    else:
+        model = base = fm.FontStyleNet(num_fonts=100, pretrained=False).to(device).eval()
+
+    crops = make_crops(args.images)
+    fm.embed_images(model, crops[:8], device=device)   # warm-up
+
+    t_old, old = timed(embed_one_by_one, base, crops, device)
+    print(f"device={device} threads={torch.get_num_threads()} images={len(crops)} runtime={args.runtime}")
+    print(f"one-by-one : {len(crops) / t_old:8.1f} img/s  (float)")
+
+    for bs in args.batch:
+        t_new, new = timed(fm.embed_images, model, crops, bs, device)
+        diff = (old - new).abs().max().item()
+        print(f"batch {bs:4d} : {len(crops) / t_new:8.1f} img/s  (x{t_old / t_new:.1f}, max diff {diff:.2e})")
+
+
+if __name__ == "__main__":
+    main()
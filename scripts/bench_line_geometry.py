@@ -0,0 +1,75 @@
+"""
+줄 geometry 계산 벤치마크: 줄 단위(기준 구현) vs 페이지 단위 NumPy.
+
+    python -m scripts.bench_line_geometry --lines 2000 --symbols 12
+
+dense 페이지를 흉내낸 가짜 OCR 줄을 만들어서 두 구현의 결과가 같은지 확인하고 시간을 잰다.
+"""
+import time
+import random
+import argparse
+from array import array
+
+import numpy as np
+
+from utils.ocr import OcrLine, MISSING
+from utils.ocr_geometry import compute_line_geometry, compute_line_geometry_scalar
+
+
+def make_lines(n_lines, n_symbols, seed=0):
+    rnd = random.Random(seed)
+    lines = []
+
+    for li in range(n_lines):
+        verts = array("i")
+        x0, y0 = rnd.randint(0, 1800), rnd.randint(0, 15000)
+        vertical = rnd.random() < 0.2
+
+        for si in range(n_symbols):
+            size = rnd.randint(12, 40)
+            x = x0 + (0 if vertical else si * size)
+            y = y0 + (si * size if vertical else 0)
+            for vx, vy in ((x, y), (x + size, y), (x + size, y + size), (x, y + size)):
+                # Vision은 0 좌표를 빼므로 가끔 누락된 좌표도 섞음
+                r = rnd.random()
+                verts.append(MISSING if r < 0.02 else vx)
+                verts.append(MISSING if 0.02 <= r < 0.04 else vy)
+
+        lines.append(OcrLine("x" * n_symbols, li, verts, n_symbols))
+
+    return lines
+
+
+def bench(fn, lines, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(lines)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--symbols", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines, args.symbols)
+
+    t_scalar, ref = bench(compute_line_geometry_scalar, lines, args.repeat)
+    t_numpy, out = bench(compute_line_geometry, lines, args.repeat)
+
+    for key in ref:
+        if not np.array_equal(ref[key], out[key]):
+            raise SystemExit(f"mismatch in {key}")
+
+    n_sym = args.lines * args.symbols
+    print(f"lines={args.lines} symbols={n_sym}")
+    print(f"scalar : {t_scalar * 1000:8.1f} ms")
+    print(f"numpy  : {t_numpy * 1000:8.1f} ms  (x{t_scalar / t_numpy:.1f})")
+
+
+if __name__ == "__main__":
+    main()
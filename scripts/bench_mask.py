@@ -0,0 +1,96 @@
+"""
+OCR 마스크 생성 벤치마크: 기존 방식(페이지 디코딩 + ImageDraw.polygon 단어별 + 기본 PNG) vs utils.mask.
+
+    python -m scripts.bench_mask --height 15000 --balloons 40
+
+말풍선마다 몇 줄의 단어 polygon을 흉내낸 가짜 text_annotations 로
+마스크 생성 + PNG 인코딩까지의 시간과 PNG 크기를 비교한다.
+(utils.mask 는 cv2 가 있으면 cv2 경로, 없으면 NumPy 경로; --no-cv2 로 NumPy 강제)
+"""
+import io
+import time
+import random
+import argparse
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import utils.mask as mask_mod
+
+
+def make_annotations(width, height, n_balloons, seed=0):
+    rnd = random.Random(seed)
+    words = []
+    for _ in range(n_balloons):
+        bx, by = rnd.uniform(20, width * 0.6), rnd.uniform(0, height - 300)
+        for line in range(rnd.randint(3, 7)):
+            x, y = bx, by + line * 32
+            for _ in range(rnd.randint(3, 6)):
+                w = rnd.uniform(20, 50)
+                tilt = rnd.randint(-2, 2)
+                pts = [(x, y), (x + w, y + tilt), (x + w, y + 26 + tilt), (x, y + 26)]
+                words.append(SimpleNamespace(bounding_poly=SimpleNamespace(
+                    vertices=[SimpleNamespace(x=int(px), y=int(py)) for px, py in pts]
+                )))
+                x += w + 8
+    return [None] + words
+
+
+def old_mask(page_png, annotations):
+    img = Image.open(io.BytesIO(page_png)).convert("RGB")
+    mask = Image.new("L", img.size, 0)
+    draw = ImageDraw.Draw(mask)
+    for txt in annotations[1:]:
+        draw.polygon([(v.x, v.y) for v in txt.bounding_poly.vertices], fill=255)
+    buf = io.BytesIO()
+    mask.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def new_mask(page_png, annotations):
+    size = Image.open(io.BytesIO(page_png)).size
+    return mask_mod.encode_mask_png(mask_mod.build_text_mask(size, annotations))
+
+
+def bench(fn, repeat, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=15000)
+    parser.add_argument("--balloons", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-cv2", action="store_true")
+    args = parser.parse_args()
+
+    if args.no_cv2:
+        mask_mod.cv2 = None
+
+    page = Image.fromarray(
+        np.random.default_rng(0).integers(200, 256, (args.height, args.width, 3), dtype=np.uint8)
+    )
+    buf = io.BytesIO()
+    page.save(buf, format="PNG")
+    page_png = buf.getvalue()
+    annotations = make_annotations(args.width, args.height, args.balloons)
+
+    t_old, old_png = bench(old_mask, args.repeat, page_png, annotations)
+    t_new, new_png = bench(new_mask, args.repeat, page_png, annotations)
+
+    print(f"page={args.width}x{args.height} words={len(annotations) - 1} "
+          f"backend={'cv2' if mask_mod.cv2 is not None else 'numpy'}")
+    print(f"old : {t_old * 1000:8.1f} ms  png {len(old_png) / 1024:7.1f} KB")
+    print(f"new : {t_new * 1000:8.1f} ms  png {len(new_png) / 1024:7.1f} KB  (x{t_old / t_new:.1f}, "
+          f"dilate={mask_mod.MASK_DILATE_PX} merge={mask_mod.MASK_MERGE_PX})")
+
+
+if __name__ == "__main__":
+    main()
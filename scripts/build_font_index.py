@@ -0,0 +1,37 @@
+"""
+폰트 갤러리 index 미리 만들기 (서버 시작 시 갤러리 계산을 건너뛰도록).
+
+    python -m scripts.build_font_index           # 체크포인트 / 데이터셋이 바뀐 경우에만 다시 계산
+    python -m scripts.build_font_index --force   # 무조건 다시 계산
+
+FONT_MODEL_PATH / FONT_DATA_ROOT / FONT_INDEX_DIR 환경변수를 서버와 똑같이 읽는다.
+"""
+import time
+import argparse
+
+from services.font_model import (
+    FONT_INDEX_DIR, load_checkpoint, load_font_model, load_gallery, build_gallery_index,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    checkpoint, checkpoint_sha = load_checkpoint()
+    model = load_font_model(checkpoint)
+    print(f"checkpoint sha256={checkpoint_sha[:16]} fonts={len(checkpoint['font_ids'])} "
+          f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+    t0 = time.perf_counter()
+    if args.force:
+        font_ids, _ = build_gallery_index(model, checkpoint, checkpoint_sha)
+    else:
+        font_ids, _ = load_gallery(model, checkpoint, checkpoint_sha)
+    print(f"gallery: {len(font_ids)} fonts in {FONT_INDEX_DIR} ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+CPU 서빙용 FontStyleNet export (TorchScript + 양자화).
+
+    python -m scripts.export_font_model                      # int8: Linear 동적 양자화
+    python -m scripts.export_font_model --static             # + static: FX 정적 양자화 (conv 포함, 갤러리 샘플로 calibration)
+    python -m scripts.export_font_model --static --min-agreement 0.98
+
+결과: {FONT_EXPORT_DIR}/font_style_{체크포인트 sha256 앞 16자}_{int8|static}.pt (+ 같은 이름 .json: 양자화 엔진)
+서버는 FONT_MODEL_RUNTIME=int8 (또는 static) 일 때 이 파일을 읽는다 (FONT_INTRA_OP_THREADS 로 스레드 수).
+
+export 한 모델마다 float 모델과 비교:
+    갤러리 샘플(없으면 가짜 crop)을 쿼리로, float 갤러리 임베딩에 대한 top-1 / top-3 일치율
+    일치율이 --min-agreement 보다 낮으면 파일을 저장하지 않고 종료 코드 1
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+
+import torch
+import torch.nn as nn
+from PIL import Image
+
+import services.font_model as fm
+from scripts.bench_font_embedding import make_crops
+
+# 양자화 모델은 CPU 전용 → 비교 기준 float 모델도 CPU에서
+CPU = torch.device("cpu")
+
+
+def quantize_dynamic_linear(model):
+    """fc_emb / fc_cls (nn.Linear) 만 int8 동적 양자화. conv backbone 은 float 그대로"""
+    return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model).cpu(), {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model, calib_images, backend):
+    """FX graph mode 정적 양자화 (conv + linear, 활성값 범위는 calib_images 로 측정)"""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    example = fm.preprocess_images(calib_images[:1])
+    prepared = prepare_fx(copy.deepcopy(model).cpu().eval(), get_default_qconfig_mapping(backend), (example,))
+    with torch.no_grad():
+        for i in range(0, len(calib_images), fm.FONT_EMBED_BATCH):
+            prepared(fm.preprocess_images(calib_images[i:i + fm.FONT_EMBED_BATCH]))
+    return convert_fx(prepared)
+
+
+def to_torchscript(model):
+    example = torch.zeros(2, 3, fm.FONT_INPUT_SIZE, fm.FONT_INPUT_SIZE)
+    with torch.no_grad():
+        scripted = torch.jit.trace(model, example)
+    return torch.jit.freeze(scripted.eval())
+
+
+def query_images(checkpoint, limit):
+    """갤러리 샘플 PNG (데이터셋이 없으면 가짜 crop)"""
+    samples, _ = fm.current_dataset(checkpoint["font_ids"])
+    if not samples:
+        print("font dataset not found, using synthetic crops for calibration / agreement")
+        return make_crops(limit)
+
+    images = []
+    for paths in samples.values():
+        for p in paths:
+            with Image.open(p) as img:
+                images.append(img.convert("L"))
+    return images[:limit]
+
+
+def agreement(float_embs, quant_embs, gallery):
+    """float / 양자화 임베딩의 top-1 일치율, top-3 집합 일치율, 임베딩 최대 차이"""
+    k = min(3, gallery.shape[0])
+    top_f = torch.topk(float_embs @ gallery.T, k, dim=1).indices
+    top_q = torch.topk(quant_embs @ gallery.T, k, dim=1).indices
+    top1 = (top_f[:, 0] == top_q[:, 0]).float().mean().item()
+    top3 = sum(set(a) == set(b) for a, b in zip(top_f.tolist(), top_q.tolist())) / len(top_f)
+    return top1, top3, (float_embs - quant_embs).abs().max().item()
+
+
+def latency_ms(model, images, batch, repeat):
+    fm.embed_images(model, images[:batch], batch, CPU)   # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fm.embed_images(model, images[:batch], batch, CPU)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--static", action="store_true", help="FX 정적 양자화 모델도 export")
+    parser.add_argument("--backend", default="x86", help="양자화 엔진 (x86 / fbgemm / qnnpack) - 서버도 이 엔진으로 로드")
+    parser.add_argument("--samples", type=int, default=512, help="calibration / 일치율 확인에 쓰는 이미지 수")
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="top-3 일치율 하한")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if fm.FONT_INTRA_OP_THREADS > 0:
+        torch.set_num_threads(fm.FONT_INTRA_OP_THREADS)
+
+    if args.backend not in torch.backends.quantized.supported_engines:
+        sys.exit(f"quantized engine {args.backend} not supported here "
+                 f"({', '.join(torch.backends.quantized.supported_engines)})")
+    torch.backends.quantized.engine = args.backend
+
+    checkpoint, checkpoint_sha = fm.load_checkpoint(device=CPU)
+    model = fm.load_font_model(checkpoint, device=CPU)
+    _, gallery = fm.load_gallery(model, checkpoint, checkpoint_sha, device=CPU)
+
+    images = query_images(checkpoint, args.samples)
+    float_embs = fm.embed_images(model, images, device=CPU)
+    print(f"checkpoint sha256={checkpoint_sha[:16]} queries={len(images)} "
+          f"engine={args.backend} threads={torch.get_num_threads()}")
+    print(f"float  : batch1 {latency_ms(model, images, 1, args.repeat):7.2f} ms  "
+          f"batch{fm.FONT_EMBED_BATCH} {latency_ms(model, images, fm.FONT_EMBED_BATCH, args.repeat):8.1f} ms")
+
+    variants = [("int8", lambda: quantize_dynamic_linear(model))]
+    if args.static:
+        variants.append(("static", lambda: quantize_static(model, images, args.backend)))
+
+    os.makedirs(fm.FONT_EXPORT_DIR, exist_ok=True)
+    failed = False
+    for runtime, build in variants:
+        scripted = to_torchscript(build())
+        top1, top3, diff = agreement(float_embs, fm.embed_images(scripted, images, device=CPU), gallery)
+        print(f"{runtime:6s} : batch1 {latency_ms(scripted, images, 1, args.repeat):7.2f} ms  "
+              f"batch{fm.FONT_EMBED_BATCH} {latency_ms(scripted, images, fm.FONT_EMBED_BATCH, args.repeat):8.1f} ms  "
+              f"top1 {top1:.3f} top3 {top3:.3f} max diff {diff:.3f}")
+
+        if top3 < args.min_agreement:
+            print(f"{runtime}: top-3 agreement {top3:.3f} < {args.min_agreement}, not saved")
+            failed = True
+            continue
+        path = fm.exported_model_path(checkpoint_sha, runtime)
+        scripted.save(path)
+        with open(fm.exported_meta_path(path), "w", encoding="utf-8") as f:
+            json.dump({"runtime": runtime, "backend": args.backend, "checkpoint_sha256": checkpoint_sha}, f)
+        print(f"saved {path}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# services/font_model.py
+"""
+폰트 스타일 모델 (FontStyleNet) 로드 + 폰트 갤러리 생성 / 저장된 index 로드.
+import 시점에 아무것도 로드하지 않음 (font_service, scripts/build_font_index.py 에서 공용).
+"""
+import os
+import io
+import json
+import hashlib
+
+from PIL import Image
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torchvision.transforms as T
+from torchvision.models import resnet18
+
+from utils.font_index import dataset_samples, dataset_fingerprint, load_gallery_index, save_gallery_index
+
+# 프로젝트 루트 = flask_server/ 기준
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+FONT_MODEL_PATH = os.environ.get(
+    "FONT_MODEL_PATH", os.path.join(BASE_DIR, "font_models", "font_style_resnet18.pth")
+)
+FONT_DATA_ROOT = os.environ.get("FONT_DATA_ROOT", os.path.join(BASE_DIR, "font_dataset"))
+FONT_INDEX_DIR = os.environ.get("FONT_INDEX_DIR", os.path.join(BASE_DIR, "font_models", "index"))
+# 폰트당 갤러리 임베딩에 쓰는 샘플 수 (속도용)
+FONT_GALLERY_PER_FONT = int(os.environ.get("FONT_GALLERY_PER_FONT", "5"))
+# 임베딩 추출 배치 크기 (갤러리 생성 / 요청 공용)
+FONT_EMBED_BATCH = int(os.environ.get("FONT_EMBED_BATCH", "64"))
+FONT_INPUT_SIZE = 128
+FONT_EMB_DIM = 256
+
+# CPU 서빙용 런타임: float (기본) | int8 (Linear 동적 양자화) | static (FX 정적 양자화)
+# int8 / static 은 scripts/export_font_model.py 로 미리 만든 TorchScript 파일을 읽음
+FONT_RUNTIMES = ("float", "int8", "static")
+FONT_MODEL_RUNTIME = os.environ.get("FONT_MODEL_RUNTIME", "float")
+FONT_EXPORT_DIR = os.environ.get("FONT_EXPORT_DIR", os.path.join(BASE_DIR, "font_models", "export"))
+# 0 이면 torch 기본값
+FONT_INTRA_OP_THREADS = int(os.environ.get("FONT_INTRA_OP_THREADS", "0"))
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+# ----------------- 폰트 모델 정의 ----------------- #
+class FontStyleNet(nn.Module):
+    def __init__(self, num_fonts, emb_dim=256, pretrained=True):
+        super().__init__()
+        # 체크포인트를 바로 덮어쓸 때는 ImageNet 가중치를 받을 필요 없음
+        backbone = resnet18(weights="IMAGENET1K_V1" if pretrained else None)
+        backbone.fc = nn.Identity()  # 마지막 FC 제거 → 512-dim
+        self.backbone = backbone
+        self.fc_emb = nn.Linear(512, emb_dim)
+        self.fc_cls = nn.Linear(emb_dim, num_fonts)
+
+    def forward(self, x):
+        feat = self.backbone(x)       # (B, 512)
+        emb = self.fc_emb(feat)       # (B, emb_dim)
+        emb = F.normalize(emb, dim=1) # L2 정규화
+        logits = self.fc_cls(emb)     # (B, num_fonts)
+        return emb, logits
+
+
+def load_checkpoint(model_path=FONT_MODEL_PATH, device=device):
+    """(checkpoint dict, sha256) - 파일을 한 번만 읽어서 해시와 torch.load 에 같이 씀"""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Font model checkpoint not found: {model_path}")
+    with open(model_path, "rb") as f:
+        data = f.read()
+    checkpoint = torch.load(io.BytesIO(data), map_location=device)
+    return checkpoint, hashlib.sha256(data).hexdigest()
+
+
+def load_font_model(checkpoint, device=device):
+    model = FontStyleNet(num_fonts=len(checkpoint["font_ids"]), emb_dim=FONT_EMB_DIM, pretrained=False).to(device)
+    model.load_state_dict(checkpoint["model_state_dict"])
+    model.eval()
+    return model
+
+
+def exported_model_path(checkpoint_sha, runtime):
+    return os.path.join(FONT_EXPORT_DIR, f"font_style_{checkpoint_sha[:16]}_{runtime}.pt")
+
+
+def exported_meta_path(model_path):
+    """export 파일 옆 sidecar: 양자화 엔진(backend) 등"""
+    return model_path[:-3] + ".json"
+
+
+def load_runtime_model(model, checkpoint_sha, runtime=FONT_MODEL_RUNTIME, device=device):
+    """
+    요청 처리에 쓸 모델. float 이면 model 그대로,
+    int8 / static 이면 같은 체크포인트로 export 해 둔 TorchScript (CPU 전용).
+    알 수 없는 runtime / export 파일·엔진 없음 / CUDA 사용 중이면 경고 후 float.
+    """
+    if FONT_INTRA_OP_THREADS > 0:
+        torch.set_num_threads(FONT_INTRA_OP_THREADS)
+    if runtime not in FONT_RUNTIMES:
+        print(f"[font_model] unknown FONT_MODEL_RUNTIME={runtime!r} "
+              f"(expected one of {', '.join(FONT_RUNTIMES)}), using float")
+        return model
+    if runtime == "float":
+        return model
+
+    if device.type != "cpu":
+        print(f"[font_model] runtime {runtime} is CPU only, using float on {device}")
+        return model
+    path = exported_model_path(checkpoint_sha, runtime)
+    meta_path = exported_meta_path(path)
+    if not os.path.exists(path) or not os.path.exists(meta_path):
+        print(f"[font_model] {path} not found (run python -m scripts.export_font_model), using float")
+        return model
+
+    # export 할 때 쓴 양자화 엔진으로 맞춰야 packed weight 가 제대로 동작
+    with open(meta_path, "r", encoding="utf-8") as f:
+        backend = json.load(f).get("backend")
+    if backend not in torch.backends.quantized.supported_engines:
+        print(f"[font_model] quantized engine {backend!r} not supported here "
+              f"({', '.join(torch.backends.quantized.supported_engines)}), using float")
+        return model
+    torch.backends.quantized.engine = backend
+
+    scripted = torch.jit.load(path, map_location="cpu")
+    scripted.eval()
+    print(f"[font_model] runtime {runtime}: {path} (engine={backend}, threads={torch.get_num_threads()})")
+    return scripted
+
+
+# 전처리 transform은 한 번만 만들어서 재사용
+_to_tensor = T.ToTensor()
+_resize = T.Resize((FONT_INPUT_SIZE, FONT_INPUT_SIZE))
+
+
+def preprocess_images(images):
+    """
+    PIL 이미지 목록 → (N, 3, 128, 128) float tensor.
+    흑백 1채널로 resize 한 뒤 3채널은 expand (복사 없이) - 채널 3개를 각각 resize 하던 것과 값이 같음.
+    """
+    batch = torch.stack([_resize(_to_tensor(img.convert("L"))) for img in images], dim=0)  # (N, 1, H, W)
+    return batch.expand(-1, 3, -1, -1)
+
+
+def embed_images(model, images, batch_size=FONT_EMBED_BATCH, device=device):
+    """PIL 이미지(또는 crop) 여러 장 → (N, D) L2 정규화 임베딩 (device 위). batch_size 장씩 forward"""
+    if not images:
+        return torch.zeros((0, FONT_EMB_DIM), device=device)
+    out = []
+    with torch.inference_mode():
+        for i in range(0, len(images), batch_size):
+            x = preprocess_images(images[i:i + batch_size]).to(device)
+            emb, _ = model(x)
+            out.append(emb)
+    return torch.cat(out, dim=0)
+
+
+def build_gallery(model, samples, device=device):
+    """samples: {font_id: [png 경로]} → (font_ids, (F, D) float32 ndarray) 폰트별 평균 임베딩"""
+    font_ids = list(samples.keys())
+    if not font_ids:
+        raise RuntimeError(f"no gallery images under {FONT_DATA_ROOT}")
+
+    images, owner = [], []
+    for i, font_id in enumerate(font_ids):
+        for p in samples[font_id]:
+            with Image.open(p) as img:
+                images.append(img.convert("L"))
+            owner.append(i)
+
+    # 전체 샘플을 배치로 한 번에 → 폰트별 합 / 개수로 평균
+    embs = embed_images(model, images, device=device).cpu()                       # (N, D)
+    owner = torch.tensor(owner)
+    sums = torch.zeros(len(font_ids), embs.shape[1]).index_add_(0, owner, embs)
+    counts = torch.bincount(owner, minlength=len(font_ids)).unsqueeze(1)
+    gallery = F.normalize(sums / counts, dim=1)
+    return font_ids, gallery.numpy().astype(np.float32)
+
+
+def current_dataset(font_ids):
+    """(samples, fingerprint) - 데이터셋 폴더가 없으면 (None, None)"""
+    if not os.path.isdir(FONT_DATA_ROOT):
+        return None, None
+    samples = dataset_samples(FONT_DATA_ROOT, font_ids, FONT_GALLERY_PER_FONT)
+    return samples, dataset_fingerprint(FONT_DATA_ROOT, samples)
+
+
+def build_gallery_index(model, checkpoint, checkpoint_sha, device=device):
+    """갤러리를 새로 계산해서 FONT_INDEX_DIR 에 저장: (font_ids, embs ndarray)"""
+    samples, dataset_fp = current_dataset(checkpoint["font_ids"])
+    if samples is None:
+        raise FileNotFoundError(f"Font dataset root not found: {FONT_DATA_ROOT}")
+
+    font_ids, embs = build_gallery(model, samples, device)
+    path = save_gallery_index(FONT_INDEX_DIR, checkpoint_sha, dataset_fp, font_ids, embs)
+    print(f"[font_model] saved gallery index {path} ({len(font_ids)} fonts)")
+    return font_ids, embs
+
+
+def load_gallery(model, checkpoint, checkpoint_sha, allow_build=True, device=device):
+    """
+    저장된 index (체크포인트 / 데이터셋이 그대로면) → 없거나 stale 이면 allow_build 일 때만 새로 생성.
+    반환: (font_ids, (F, D) tensor on device)
+    """
+    _, dataset_fp = current_dataset(checkpoint["font_ids"])
+    found = load_gallery_index(FONT_INDEX_DIR, checkpoint_sha, dataset_fp)
+
+    if found is None:
+        if not allow_build:
+            raise FileNotFoundError(
+                f"Font gallery index missing or stale in {FONT_INDEX_DIR} "
+                f"(run python -m scripts.build_font_index)"
+            )
+        print("[font_model] gallery index missing or stale, rebuilding")
+        found = build_gallery_index(model, checkpoint, checkpoint_sha, device)
+
+    font_ids, embs = found
+    return font_ids, torch.from_numpy(embs).to(device)
@@ -1,28 +1,36 @@
 # services/font_service.py
 import os
-import io
-from io import BytesIO
-from glob import glob
+import time
 from urllib.parse import urlparse
 
-import boto3
 from PIL import Image
 
 import torch
-import torch.nn as nn
 import torch.nn.functional as F
-import torchvision.transforms as T
-from torchvision.models import resnet18
+from botocore.exceptions import ClientError
 from google.cloud import vision
-from dotenv import load_dotenv
-load_dotenv()
+from utils.s3_client import get_s3_client, is_not_found, S3_BUCKET
+from utils.image_cache import image_cache
+from utils.blob_cache import blob_cache
+from utils.vision_client import get_vision_client
+from utils.ocr_index import load_line_index_by_key
+from services.font_model import (
+    device, load_checkpoint, load_font_model, load_gallery, load_runtime_model, embed_images,
+)
+
+# 갤러리 index가 없거나 stale 일 때 서버 시작 중에 새로 만들지 (0이면 scripts/build_font_index 로만)
+FONT_INDEX_AUTO_BUILD = os.environ.get("FONT_INDEX_AUTO_BUILD", "1") != "0"
+
+# 줄 / 블록 단위 추천: crop 여백, 이보다 작은 박스는 제외
+FONT_GRANULARITIES = ("page", "line", "block")
+FONT_REGION_PAD = int(os.environ.get("FONT_REGION_PAD", "2"))
+FONT_REGION_MIN_PX = int(os.environ.get("FONT_REGION_MIN_PX", "8"))
 
 
 # --- 공통 설정 ---
-s3 = boto3.client("s3")
-BUCKET_NAME = os.environ.get("S3_BUCKET")
-vision_client = vision.ImageAnnotatorClient()
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+s3 = get_s3_client()
+BUCKET_NAME = S3_BUCKET
+vision_client = get_vision_client()
 
 
 def _extract_filename(url: str) -> str:
@@ -30,88 +38,25 @@ def _extract_filename(url: str) -> str:
     return os.path.basename(parsed.path)
 
 
-# ----------------- 폰트 모델 정의 ----------------- #
-class FontStyleNet(nn.Module):
-    def __init__(self, num_fonts, emb_dim=256):
-        super().__init__()
-        backbone = resnet18(weights="IMAGENET1K_V1")
-        backbone.fc = nn.Identity()  # 마지막 FC 제거 → 512-dim
-        self.backbone = backbone
-        self.fc_emb = nn.Linear(512, emb_dim)
-        self.fc_cls = nn.Linear(emb_dim, num_fonts)
-
-    def forward(self, x):
-        feat = self.backbone(x)       # (B, 512)
-        emb = self.fc_emb(feat)       # (B, emb_dim)
-        emb = F.normalize(emb, dim=1) # L2 정규화
-        logits = self.fc_cls(emb)     # (B, num_fonts)
-        return emb, logits
-
-
 def _load_font_model_and_gallery():
-    # 프로젝트 루트 = flask_server/ 기준 잡기
-    base_dir = os.path.dirname(os.path.dirname(__file__))
-    model_path = os.path.join(base_dir, "font_models", "font_style_resnet18.pth")
-    font_data_root = os.path.join(base_dir, "font_dataset")
-
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Font model checkpoint not found: {model_path}")
-    if not os.path.exists(font_data_root):
-        raise FileNotFoundError(f"Font dataset root not found: {font_data_root}")
-
-    checkpoint = torch.load(model_path, map_location=device)
-
-    font_ids = checkpoint["font_ids"]
-    num_fonts = len(font_ids)
-
-    model = FontStyleNet(num_fonts=num_fonts, emb_dim=256).to(device)
-    model.load_state_dict(checkpoint["model_state_dict"])
-    model.eval()
-
-    # --- 폰트 갤러리 생성 ---
-    gallery = {}
-    with torch.no_grad():
-        for font_id in sorted(font_ids):
-            folder = os.path.join(font_data_root, font_id)
-            if not os.path.isdir(folder):
-                continue
-
-            img_paths = glob(os.path.join(folder, "*.png"))
-            if len(img_paths) == 0:
-                continue
+    checkpoint, checkpoint_sha = load_checkpoint()
+    model = load_font_model(checkpoint)
 
-            embs = []
-            # 폰트당 최대 5장만 사용 (속도용)
-            for p in img_paths[:5]:
-                img = Image.open(p).convert("L")
-                img_t = T.ToTensor()(img)         # (1, H, W)
-                img_t = img_t.repeat(3, 1, 1)     # (3, H, W)
-                img_t = T.Resize((128, 128))(img_t)
-                img_t = img_t.unsqueeze(0).to(device)  # (1, 3, 128, 128)
+    # 폰트 갤러리: 미리 계산해 둔 index (mmap) 로드, 모델/데이터셋이 바뀌었을 때만 재생성
+    font_ids_gallery, gallery_embs = load_gallery(
+        model, checkpoint, checkpoint_sha, allow_build=FONT_INDEX_AUTO_BUILD
+    )
 
-                emb, _ = model(img_t)
-                embs.append(emb.squeeze(0).cpu())
-
-            if not embs:
-                continue
-
-            embs = torch.stack(embs, dim=0)   # (N, D)
-            mean_emb = embs.mean(dim=0)       # (D,)
-            mean_emb = F.normalize(mean_emb, dim=0)
-            gallery[font_id] = mean_emb
-
-    font_ids_gallery = sorted(gallery.keys())
-    gallery_embs = torch.stack(
-        [gallery[fid] for fid in font_ids_gallery], dim=0
-    ).to(device)  # (F, D)
-
-    return model, font_ids_gallery, gallery_embs
+    # 요청 처리용 모델 (FONT_MODEL_RUNTIME=int8/static 이면 export 해 둔 양자화 TorchScript)
+    return load_runtime_model(model, checkpoint_sha), font_ids_gallery, gallery_embs
 
 
 # 모듈 import 시점에 한 번만 로드 (실패해도 서버 죽지 않게 try/except)
 try:
+    _t0 = time.perf_counter()
     FONT_MODEL, FONT_IDS_GALLERY, GALLERY_EMBS = _load_font_model_and_gallery()
-    print(f"[font_service] loaded font model, num_fonts={len(FONT_IDS_GALLERY)}")
+    print(f"[font_service] loaded font model, num_fonts={len(FONT_IDS_GALLERY)} "
+          f"({(time.perf_counter() - _t0) * 1000:.0f} ms)")
 except Exception as e:
     print("[font_service] WARNING: failed to load font model:", e)
     FONT_MODEL = None
@@ -120,16 +65,7 @@ except Exception as e:
 
 
 def _extract_embedding_from_pil(pil_img: Image.Image) -> torch.Tensor:
-    pil_img = pil_img.convert("L")
-    img_t = T.ToTensor()(pil_img)          # (1, H, W)
-    img_t = img_t.repeat(3, 1, 1)          # (3, H, W)
-    img_t = T.Resize((128, 128))(img_t)
-    img_t = img_t.unsqueeze(0).to(device)  # (1, 3, 128, 128)
-
-    with torch.no_grad():
-        emb, _ = FONT_MODEL(img_t)
-        emb = F.normalize(emb, dim=1)      # (1, D)
-    return emb.squeeze(0)                  # (D,)
+    return embed_images(FONT_MODEL, [pil_img])[0]  # (D,)
 
 
 def _download_original_image_from_s3(image_url: str) -> Image.Image:
@@ -137,23 +73,41 @@ def _download_original_image_from_s3(image_url: str) -> Image.Image:
     # 지금은 파일명이 같다고 가정. 필요하면 여기서 규칙 조금 바꿔도 됨.
     key = f"images/{filename}"
 
-    obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-    img_bytes = obj["Body"].read()
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    return img
-
-
-def _crop_text_region_with_vision(img: Image.Image) -> Image.Image:
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-
-    image = vision.Image(content=buf.getvalue())
-    response = vision_client.text_detection(image=image)
+    # 디코딩 캐시 경유 (반환 이미지는 공유되므로 수정 금지)
+    return image_cache.get(key)
+
+
+def _stored_text_bounds(filename: str):
+    """
+    /api/ocr/auto 가 저장한 OCR 결과(줄 index)에서 글자 영역 전체를 감싸는 사각형.
+    반환: (min_x, min_y, max_x, max_y) / 글자가 하나도 없으면 () / OCR 결과가 없으면 None
+    """
+    try:
+        idx = load_line_index_by_key(f"ocr_results/{filename}.json")
+    except ClientError as e:
+        if not is_not_found(e):
+            raise
+        return None
+
+    boxes = [i for i in range(len(idx)) if idx.width[i] > 0 and idx.height[i] > 0]
+    if not boxes:
+        return ()
+    return (
+        min(idx.x[i] for i in boxes),
+        min(idx.y[i] for i in boxes),
+        max(idx.x[i] + idx.width[i] for i in boxes),
+        max(idx.y[i] + idx.height[i] for i in boxes),
+    )
+
+
+def _vision_text_bounds(filename: str):
+    """OCR 결과가 없을 때만: 원본 바이트를 그대로 Vision에 (PNG 재인코딩 없음)"""
+    img_bytes = blob_cache.get_bytes(f"images/{filename}")
+    response = vision_client.text_detection(image=vision.Image(content=img_bytes))
     annotations = response.text_annotations
 
     if not annotations or len(annotations) <= 1:
-        return img
+        return ()
 
     xs, ys = [], []
     for txt in annotations[1:]:
@@ -162,11 +116,18 @@ def _crop_text_region_with_vision(img: Image.Image) -> Image.Image:
             ys.append(v.y)
 
     if not xs or not ys:
-        return img
+        return ()
+    return min(xs), min(ys), max(xs), max(ys)
 
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
 
+def _crop_text_region(img: Image.Image, filename: str) -> Image.Image:
+    bounds = _stored_text_bounds(filename)
+    if bounds is None:
+        bounds = _vision_text_bounds(filename)
+    if not bounds:
+        return img
+
+    min_x, min_y, max_x, max_y = bounds
     min_x = max(0, min_x)
     min_y = max(0, min_y)
     max_x = min(img.width,  max_x)
@@ -178,36 +139,123 @@ def _crop_text_region_with_vision(img: Image.Image) -> Image.Image:
     return img.crop((min_x, min_y, max_x, max_y))
 
 
+def _recommend_many(embs: torch.Tensor, k: int = 3) -> list:
+    """(R, D) 임베딩 → 행마다 top-k [{name, similarity}] (갤러리와 matmul 한 번)"""
+    sims = torch.matmul(embs.to(device), GALLERY_EMBS.T)  # (R, F)
+    topk_vals, topk_idx = torch.topk(sims, k=min(k, sims.shape[1]), dim=1)
+
+    return [
+        [
+            {"name": FONT_IDS_GALLERY[i], "similarity": round(v, 4)}
+            for v, i in zip(vals, idxs)
+        ]
+        for vals, idxs in zip(topk_vals.tolist(), topk_idx.tolist())
+    ]
+
+
+def _text_regions(filename: str, granularity: str, size) -> list:
+    """
+    저장된 OCR 줄 index (ocr_results/{filename}.lines.bin) 에서 줄 / 블록 단위 박스.
+    반환: [{"block", "text", "bbox": {x, y, width, height}}] (이미지 밖은 잘라내고 너무 작은 박스는 제외)
+    """
+    idx = load_line_index_by_key(f"ocr_results/{filename}.json")
+    width, height = size
+
+    regions = []
+    by_block = {}
+    for i in range(len(idx)):
+        x, y, w, h = idx.x[i], idx.y[i], idx.width[i], idx.height[i]
+        block = idx.block[i]
+        r = by_block.get(block) if granularity == "block" else None
+        if r is None:
+            r = {"block": block, "text": idx.layout_texts[i], "x0": x, "y0": y, "x1": x + w, "y1": y + h}
+            regions.append(r)
+            by_block[block] = r
+            continue
+        # 같은 블록의 줄 → 박스 합치기
+        r["x0"], r["y0"] = min(r["x0"], x), min(r["y0"], y)
+        r["x1"], r["y1"] = max(r["x1"], x + w), max(r["y1"], y + h)
+        r["text"] += "\n" + idx.layout_texts[i]
+
+    out = []
+    for r in regions:
+        x0 = max(0, r["x0"] - FONT_REGION_PAD)
+        y0 = max(0, r["y0"] - FONT_REGION_PAD)
+        x1 = min(width, r["x1"] + FONT_REGION_PAD)
+        y1 = min(height, r["y1"] + FONT_REGION_PAD)
+        if x1 - x0 < FONT_REGION_MIN_PX or y1 - y0 < FONT_REGION_MIN_PX:
+            continue
+        out.append({
+            "block": r["block"],
+            "text": r["text"],
+            "bbox": {"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0},
+        })
+    return out
+
+
+def _recommend_regions(image_url: str, granularity: str) -> dict:
+    """줄 / 블록마다 추천: crop 전부를 한 번에 임베딩 → 갤러리와 matmul 한 번 → top-k"""
+    filename = _extract_filename(image_url)
+    img = _download_original_image_from_s3(image_url)
+
+    try:
+        regions = _text_regions(filename, granularity, img.size)
+    except ClientError as e:
+        if not is_not_found(e):
+            raise
+        return {
+            "recommended_fonts": [],
+            "regions": [],
+            "error": "ocr results not found (run /api/ocr/auto first)"
+        }
+
+    if not regions:
+        return {"recommended_fonts": [], "regions": []}
 
-def process_font_recommend(project_id: str, image_url: str) -> dict:
+    crops = [
+        img.crop((b["x"], b["y"], b["x"] + b["width"], b["y"] + b["height"]))
+        for b in (r["bbox"] for r in regions)
+    ]
+    embs = embed_images(FONT_MODEL, crops)  # (R, D)
+
+    # 페이지 전체 추천 = 영역 임베딩 평균 (행 하나 추가해서 같은 matmul 에 같이 태움)
+    page_emb = F.normalize(embs.mean(dim=0, keepdim=True), dim=1)
+    results = _recommend_many(torch.cat([embs, page_emb], dim=0))
+
+    for region, fonts in zip(regions, results):
+        region["recommended_fonts"] = fonts
+    return {
+        "recommended_fonts": results[-1],
+        "regions": regions
+    }
+
+
+def process_font_recommend(project_id: str, image_url: str, granularity: str = "page") -> dict:
+    """
+    granularity:
+        "page"  - 글자 영역 전체를 감싸는 사각형 하나로 top-3 (기존)
+        "line" / "block" - 저장된 OCR 결과의 줄 / 블록마다 top-3 ("regions") + 페이지 전체 top-3
+    """
     if FONT_MODEL is None or GALLERY_EMBS is None:
         return {
             "recommended_fonts": [],
             "error": "font model is not loaded on server"
         }
 
+    if granularity not in FONT_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(FONT_GRANULARITIES)}")
+    if granularity != "page":
+        return _recommend_regions(image_url, granularity)
+
     # 1) 원본 이미지 가져오기 (images/{filename})
     img = _download_original_image_from_s3(image_url)
 
-    # 2) 텍스트 영역 crop
-    text_region = _crop_text_region_with_vision(img)
-
-    # 3) 임베딩 추출
-    q_emb = _extract_embedding_from_pil(text_region).to(device)  # (D,)
+    # 2) 텍스트 영역 crop (저장된 OCR 결과 우선, 없을 때만 Vision)
+    text_region = _crop_text_region(img, _extract_filename(image_url))
 
-    # 4) 갤러리와 유사도 계산
-    sims = torch.matmul(GALLERY_EMBS, q_emb)  # (F,)
-    topk_vals, topk_idx = torch.topk(sims, k=min(3, sims.shape[0]))
-
-    recommended = []
-    for i in range(topk_vals.shape[0]):
-        fid = FONT_IDS_GALLERY[topk_idx[i].item()]
-        score = float(topk_vals[i].item())
-        recommended.append({
-            "name": fid,
-            "similarity": round(score, 4)
-        })
+    # 3) 임베딩 추출 → 4) 갤러리와 유사도 계산
+    q_emb = _extract_embedding_from_pil(text_region)  # (D,)
 
     return {
-        "recommended_fonts": recommended
+        "recommended_fonts": _recommend_many(q_emb.unsqueeze(0))[0]
     }
@@ -1,16 +1,19 @@
 import os
 import sys
-import requests
+import json
+import select
+import threading
 import subprocess
-from io import BytesIO
+import numpy as np
 from PIL import Image
-import boto3
 import shutil
 import time
 import random
-from dotenv import load_dotenv
-
-load_dotenv()
+from utils.s3_client import extract_s3_key, is_not_found, S3_BUCKET, AWS_REGION
+from utils.blob_cache import blob_cache
+from utils.image_cache import image_cache
+from utils.inpaint_tiles import plan_tiles, feather_alpha, affected_mask
+from utils.inpaint_state import inpaint_state
 
 
 # LaMa 디렉토리 (EC2 구조 기반)
@@ -20,6 +23,23 @@ PREDICT_PY = f"{LAMA_DIR}/bin/predict.py"
 # 모델 경로
 MODEL_PATH = f"{LAMA_DIR}/big-lama/models"
 
+# LaMa venv python / 상주 워커
+LAMA_PYTHON = "/home/ec2-user/lama-server/venv/bin/python"
+LAMA_WORKER_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lama_worker.py")
+LAMA_WORKER_ENABLED = os.environ.get("LAMA_WORKER", "1") != "0"
+LAMA_WORKER_TIMEOUT = float(os.environ.get("LAMA_WORKER_TIMEOUT", "300"))
+
+# 인페인팅 모드: full = 페이지 전체 (기본, 기존 동작), tiled = 마스크 주변 타일만 (요청 mode 또는 env로 선택)
+INPAINT_MODE = os.environ.get("INPAINT_MODE", "full")
+INPAINT_TILE_PAD = int(os.environ.get("INPAINT_TILE_PAD", "64"))          # 마스크 주변 문맥 (px)
+INPAINT_TILE_CELL = int(os.environ.get("INPAINT_TILE_CELL", "32"))        # 연결 영역 격자 크기 (px)
+INPAINT_TILE_MULTIPLE = int(os.environ.get("INPAINT_TILE_MULTIPLE", "128"))
+INPAINT_TILE_FEATHER = int(os.environ.get("INPAINT_TILE_FEATHER", "16"))
+# 타일 면적이 페이지의 이 비율을 넘으면 전체 인페인팅이 더 싸다
+INPAINT_TILE_MAX_COVERAGE = float(os.environ.get("INPAINT_TILE_MAX_COVERAGE", "0.6"))
+# 이전 마스크/결과가 있으면 바뀐 부분만 다시 인페인팅
+INPAINT_INCREMENTAL = os.environ.get("INPAINT_INCREMENTAL", "1") != "0"
+
 # 입력/출력 경로
 INPUT_DIR = "/home/ec2-user/lama-server/input"
 OUTPUT_DIR = "/home/ec2-user/lama-server/output"
@@ -27,31 +47,6 @@ OUTPUT_DIR = "/home/ec2-user/lama-server/output"
 os.makedirs(INPUT_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# S3 설정
-S3_BUCKET = os.environ.get("S3_BUCKET")
-AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2")
-
-s3 = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY")
-)
-
-
-def extract_s3_key(url: str):
-    after = url.split(".amazonaws.com/", 1)[1]
-    key = after.split("?", 1)[0]
-    return key
-
-
-def create_presigned(key: str):
-    return s3.generate_presigned_url(
-        ClientMethod="get_object",
-        Params={"Bucket": S3_BUCKET, "Key": key},
-        ExpiresIn=3600
-    )
-
 
 def make_temp():
     ts = str(int(time.time() * 1000))
@@ -59,16 +54,10 @@ def make_temp():
     return f"temp_{ts}_{rand}"
 
 
-def download_image(url, save_path, mode):
-    res = requests.get(url)
-    res.raise_for_status()
-    img = Image.open(BytesIO(res.content)).convert(mode)
-    img.save(save_path)
-
-
 def upload_to_s3(local_path, key):
-    s3.upload_file(local_path, S3_BUCKET, key)
-    return key
+    """반환값: 업로드된 객체의 ETag"""
+    with open(local_path, "rb") as f:
+        return blob_cache.put(key, f.read(), "image/png")
 
 
 def cleanup(path):
@@ -77,7 +66,241 @@ def cleanup(path):
 
 
 
-def inpaint_image(image_url: str, mask_url: str) -> str:
+def _lama_env():
+    env = os.environ.copy()
+    env["PYTHONPATH"] = LAMA_DIR
+    return env
+
+
+class LamaWorkerError(Exception):
+    pass
+
+
+class LamaWorker:
+    """
+    services/lama_worker.py 를 LaMa venv에서 상주 프로세스로 띄워두고
+    stdin/stdout 파이프로 (image, mask, output) 경로를 주고받는 클라이언트.
+    모델 로드는 프로세스 시작 시 한 번만 일어난다.
+    """
+
+    def __init__(self):
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def _readline(self, timeout):
+        ready, _, _ = select.select([self._proc.stdout], [], [], timeout)
+        if not ready:
+            raise LamaWorkerError("LaMa 워커 응답 시간 초과")
+        line = self._proc.stdout.readline()
+        if not line:
+            raise LamaWorkerError("LaMa 워커 종료됨")
+        return json.loads(line)
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [LAMA_PYTHON, LAMA_WORKER_PY, MODEL_PATH],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            env=_lama_env(),
+            cwd=LAMA_DIR
+        )
+        hello = self._readline(LAMA_WORKER_TIMEOUT)
+        if not hello.get("ready"):
+            raise LamaWorkerError("LaMa 워커 초기화 실패")
+        print("[inpaint_service] LaMa worker ready:", hello.get("device"))
+
+    def stop(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+                self._proc.wait(timeout=5)
+            except Exception:
+                pass
+        self._proc = None
+
+    def _request(self, req):
+        with self._lock:
+            try:
+                if not self._alive():
+                    self._start()
+
+                self._proc.stdin.write(json.dumps(req) + "\n")
+                self._proc.stdin.flush()
+                res = self._readline(LAMA_WORKER_TIMEOUT)
+            except (OSError, ValueError, LamaWorkerError):
+                # 파이프가 깨졌거나 응답이 없으면 워커를 내리고 다음 요청 때 다시 띄운다
+                self.stop()
+                raise
+
+        if not res.get("ok"):
+            raise LamaWorkerError(res.get("error", "unknown error"))
+
+    def predict(self, image_path, mask_path, output_path):
+        self._request({"image": image_path, "mask": mask_path, "output": output_path})
+        return output_path
+
+    def predict_many(self, items):
+        """items: [(image_path, mask_path, output_path)] → 워커에서 같은 크기끼리 batch 처리"""
+        self._request({"items": [
+            {"image": image, "mask": mask, "output": output} for image, mask, output in items
+        ]})
+        return [output for _, _, output in items]
+
+
+lama_worker = LamaWorker()
+
+
+def _run_lama_subprocess(workdir, outdir):
+    cmd = [
+        LAMA_PYTHON,
+        PREDICT_PY,
+        f"model.path={MODEL_PATH}",
+        f"indir={workdir}",
+        f"outdir={outdir}",
+    ]
+
+    result = subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=_lama_env()
+    )
+
+    # 실행 실패 시 에러 출력
+    if result.returncode != 0:
+        print("--- LaMa Error Log ---")
+        print(result.stdout)
+        raise Exception("LaMa 실행 오류: " + result.stdout)
+
+    # 출력 파일 찾기
+    files = [f for f in os.listdir(outdir) if f.endswith(".png")]
+    if not files:
+        raise Exception("인페인팅 결과 이미지 없음")
+
+    return os.path.join(outdir, files[0])
+
+
+def run_lama(workdir, outdir, original_path, mask_path):
+    """
+    상주 워커로 인페인팅, 워커가 죽었거나 실패하면 기존 predict.py subprocess 경로로 fallback.
+    반환값: 결과 PNG 로컬 경로
+    """
+    if LAMA_WORKER_ENABLED:
+        output_path = os.path.join(outdir, os.path.basename(mask_path))
+        try:
+            return lama_worker.predict(original_path, mask_path, output_path)
+        except Exception as e:
+            print("[inpaint_service] LaMa worker failed, fallback to subprocess:", e)
+
+    return _run_lama_subprocess(workdir, outdir)
+
+
+def run_lama_tiles(workdir, outdir, items):
+    """
+    items: [(tile_image_path, tile_mask_path, output_path)]
+    상주 워커에 한 번에 보내서 batch 처리, 실패하면 predict.py로 workdir 전체 처리.
+    (predict.py 결과 파일명도 {mask 파일명}.png 이라 output_path가 같음)
+    """
+    if LAMA_WORKER_ENABLED:
+        try:
+            return lama_worker.predict_many(items)
+        except Exception as e:
+            print("[inpaint_service] LaMa worker failed, fallback to subprocess:", e)
+
+    _run_lama_subprocess(workdir, outdir)
+    outputs = [output for _, _, output in items]
+    missing = [p for p in outputs if not os.path.exists(p)]
+    if missing:
+        raise Exception("인페인팅 결과 타일 없음: " + ", ".join(os.path.basename(p) for p in missing))
+    return outputs
+
+
+def _inpaint_tiles(image, mask_img, plan_mask, base, workdir, outdir):
+    """
+    plan_mask 연결 영역 주변 타일만 LaMa(원본 + 새 마스크)로 다시 인페인팅해서 base 위에 붙여넣음.
+    base: 붙여넣을 대상 (H×W×3 uint8, 제자리 수정) - 원본 복사본 또는 이전 인페인팅 결과
+    타일이 페이지 대부분을 덮으면 None (전체 인페인팅으로 처리).
+    반환값: 결과 PNG 로컬 경로
+    """
+    tiles = plan_tiles(plan_mask, INPAINT_TILE_PAD, INPAINT_TILE_CELL, INPAINT_TILE_MULTIPLE)
+
+    page_area = image.width * image.height
+    tile_area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in tiles)
+    if tile_area > page_area * INPAINT_TILE_MAX_COVERAGE:
+        print(f"[inpaint_service] tiles cover {tile_area / page_area:.0%} of page, fallback to full")
+        return None
+
+    mask = np.asarray(mask_img) > 0
+    items = []
+    results = {}
+    for i, tile in enumerate(tiles):
+        x0, y0, x1, y1 = tile
+        if not mask[y0:y1, x0:x1].any():
+            # 마스크가 지워지기만 한 타일: 원본 픽셀로 되돌리면 끝
+            results[i] = np.asarray(image.crop(tile))
+            continue
+        name = f"tile_{i:03d}"
+        tile_path = os.path.join(workdir, f"{name}.png")
+        tile_mask_path = os.path.join(workdir, f"{name}_mask.png")
+        image.crop(tile).save(tile_path)
+        mask_img.crop(tile).save(tile_mask_path)
+        items.append((i, (tile_path, tile_mask_path, os.path.join(outdir, f"{name}_mask.png"))))
+
+    if items:
+        outputs = run_lama_tiles(workdir, outdir, [item for _, item in items])
+        for (i, _), path in zip(items, outputs):
+            results[i] = np.asarray(Image.open(path).convert("RGB"))
+
+    # feather 붙여넣기 (대상 픽셀은 결과 그대로, 타일 안쪽 가장자리는 base와 섞음)
+    for i, (x0, y0, x1, y1) in enumerate(tiles):
+        res = results[i].astype(np.float32)
+        alpha = feather_alpha((x0, y0, x1, y1), image.size, INPAINT_TILE_FEATHER, plan_mask[y0:y1, x0:x1])
+        alpha = alpha[..., None]
+        region = base[y0:y1, x0:x1].astype(np.float32)
+        base[y0:y1, x0:x1] = (res * alpha + region * (1 - alpha) + 0.5).astype(np.uint8)
+
+    print(f"[inpaint_service] tiled inpaint: {len(tiles)} tiles ({len(items)} to LaMa), "
+          f"{tile_area / page_area:.1%} of page")
+
+    output_local = os.path.join(outdir, "image_inpaint.png")
+    Image.fromarray(base).save(output_local)
+    return output_local
+
+
+def _previous_result(image_key, image_etag, mask, output_key):
+    """
+    같은 원본(ETag)에 대한 이전 인페인팅 (마스크, 결과 이미지).
+    상태가 없거나, 원본/결과가 그 사이 바뀌었으면 None.
+    """
+    state = inpaint_state.load(image_key)
+    if state is None or state["image_etag"] != image_etag or state["output_key"] != output_key:
+        return None
+    if state["mask"].shape != mask.shape:
+        return None
+
+    try:
+        out_blob = blob_cache.get(output_key)
+    except Exception as e:
+        if is_not_found(e):
+            return None
+        raise
+    if out_blob[1] != state["output_etag"]:
+        return None
+
+    return state["mask"], image_cache.get(output_key, "RGB", blob=out_blob)
+
+
+def inpaint_image(image_url: str, mask_url: str, mode: str = None) -> str:
+
+    mode = (mode or INPAINT_MODE).lower()
+    if mode not in ("tiled", "full"):
+        raise ValueError(f"unsupported inpaint mode: {mode}")
 
     # S3 key 추출
     image_key = extract_s3_key(image_url)
@@ -87,6 +310,27 @@ def inpaint_image(image_url: str, mask_url: str) -> str:
     original_filename = image_key.split("/")[-1]
     base = original_filename.rsplit(".", 1)[0]
     output_filename = f"{base}_inpaint.png"
+    output_key = f"output/{output_filename}"
+    output_url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{output_key}"
+
+    # 이미지 / 마스크 (blob 캐시 → 디코딩 캐시)
+    image_blob = blob_cache.get(image_key)
+    image = image_cache.get(image_key, "RGB", blob=image_blob)
+    mask_img = image_cache.get(mask_key, "L")
+    mask = np.asarray(mask_img) > 0
+
+    tiled = mode == "tiled"
+    if tiled and image.size != mask_img.size:
+        print("[inpaint_service] mask size mismatch, fallback to full:", image.size, mask_img.size)
+        tiled = False
+
+    # 이전 결과가 있으면 마스크 diff 부분만 다시 인페인팅
+    previous = None
+    if tiled and INPAINT_INCREMENTAL:
+        previous = _previous_result(image_key, image_blob[1], mask, output_key)
+        if previous is not None and np.array_equal(previous[0], mask):
+            print("[inpaint_service] mask unchanged, reuse", output_key)
+            return output_url
 
     # 작업 디렉토리 생성
     temp = make_temp()
@@ -100,55 +344,33 @@ def inpaint_image(image_url: str, mask_url: str) -> str:
     mask_path = os.path.join(workdir, "image_mask.png")
 
     try:
-        # presigned URL 생성
-        presigned_original = create_presigned(image_key)
-        presigned_mask = create_presigned(mask_key)
-
-        # 이미지 다운로드
-        download_image(presigned_original, original_path, "RGB")
-        download_image(presigned_mask, mask_path, "L")
-
-        # 실행 환경 설정
-        lama_python = "/home/ec2-user/lama-server/venv/bin/python"
-        env = os.environ.copy()
-        env["PYTHONPATH"] = LAMA_DIR
-
-
-        cmd = [
-            lama_python,
-            PREDICT_PY,
-            f"model.path={MODEL_PATH}",
-            f"indir={workdir}",
-            f"outdir={outdir}",
-        ]
-
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            env=env
-        )
+        output_local = None
+
+        if previous is not None:
+            prev_mask, prev_output = previous
+            changed = prev_mask ^ mask      # 새로 칠해진 픽셀 + 지워진 픽셀
+            plan_mask = affected_mask(mask, changed, INPAINT_TILE_CELL)
+            print(f"[inpaint_service] incremental: {int(changed.sum())} px changed")
+            output_local = _inpaint_tiles(image, mask_img, plan_mask, np.array(prev_output), workdir, outdir)
 
-        # 실행 실패 시 에러 출력
-        if result.returncode != 0:
-            print("--- LaMa Error Log ---")
-            print(result.stdout)
-            raise Exception("LaMa 실행 오류: " + result.stdout)
+        # 마스크 주변 타일만 인페인팅
+        if output_local is None and tiled:
+            output_local = _inpaint_tiles(image, mask_img, mask, np.array(image), workdir, outdir)
 
-        # 출력 파일 찾기
-        files = [f for f in os.listdir(outdir) if f.endswith(".png")]
-        if not files:
-            raise Exception("인페인팅 결과 이미지 없음")
+        if output_local is None:
+            image.save(original_path)
+            mask_img.save(mask_path)
 
-        output_local = os.path.join(outdir, files[0])
+            # LaMa 실행 (상주 워커 → 실패 시 subprocess)
+            output_local = run_lama(workdir, outdir, original_path, mask_path)
 
-        # S3 업로드
-        output_key = f"output/{output_filename}"
-        upload_to_s3(output_local, output_key)
+        # S3 업로드 + 다음 증분 인페인팅을 위한 상태 저장
+        output_etag = upload_to_s3(output_local, output_key)
+        if image.size == mask_img.size:
+            inpaint_state.save(image_key, image_blob[1], mask, output_key, output_etag)
 
         # 최종 URL 반환
-        return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{output_key}"
+        return output_url
 
     finally:
         # 필요하면 정리
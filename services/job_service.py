@@ -0,0 +1,191 @@
+"""
+비동기 작업(job) 큐.
+
+오래 걸리는 작업(inpaint / ocr_auto / font_recommend)을 Flask 요청 스레드에서 떼어내서
+프로세스 내 우선순위 큐 + 작업 종류별 워커 스레드에서 실행한다.
+(외부 브로커 없이 동작, 결과는 JOB_RESULT_TTL 동안 메모리에 보관)
+
+- submit → job_id 반환
+- get / wait(long-poll) 로 상태, 결과 조회
+"""
+import os
+import time
+import uuid
+import queue
+import itertools
+import threading
+import traceback
+
+from services.inpaint_service import inpaint_image
+from services.ocr_service import process_ocr
+from services.font_service import process_font_recommend, FONT_GRANULARITIES
+from services.render_service import render_page
+
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", "3600"))
+JOB_MAX_WAIT = float(os.environ.get("JOB_MAX_WAIT", "30"))
+
+
+class JobError(Exception):
+    pass
+
+
+class Job:
+
+    def __init__(self, job_type, params, priority):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.params = params
+        self.priority = priority
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self, with_result=True):
+        data = {
+            "job_id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "failed":
+            data["error"] = self.error
+        if with_result and self.status == "done":
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+
+    def __init__(self, result_ttl):
+        self.result_ttl = result_ttl
+        self._handlers = {}     # job_type -> (handler, required_params)
+        self._queues = {}       # job_type -> PriorityQueue
+        self._jobs = {}         # job_id -> Job
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def register(self, job_type, handler, concurrency, required=(), choices=None):
+        """
+        job_type 전용 큐와 워커 스레드 concurrency개 생성.
+        choices: {param: 허용 값 tuple} - 값이 있을 때만 submit 시점에 검사
+        """
+        self._handlers[job_type] = (handler, tuple(required), dict(choices or {}))
+        self._queues[job_type] = queue.PriorityQueue()
+
+        for i in range(concurrency):
+            t = threading.Thread(
+                target=self._worker,
+                args=(job_type,),
+                name=f"job-{job_type}-{i}",
+                daemon=True
+            )
+            t.start()
+
+    def submit(self, job_type, params, priority=0):
+        if job_type not in self._handlers:
+            raise JobError(f"unknown job type: {job_type}")
+
+        _, required, choices = self._handlers[job_type]
+        missing = [k for k in required if not params.get(k)]
+        if missing:
+            raise JobError(f"{', '.join(missing)} required")
+        for k, allowed in choices.items():
+            if k in params and params[k] not in allowed:
+                raise JobError(f"{k} must be one of {', '.join(allowed)}")
+
+        job = Job(job_type, params, priority)
+        with self._lock:
+            self._purge_expired()
+            self._jobs[job.id] = job
+
+        # priority가 클수록 먼저, 같으면 먼저 들어온 순서
+        self._queues[job_type].put((-priority, next(self._seq), job))
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout):
+        """long-poll: 끝날 때까지 최대 timeout초 대기 후 Job 반환."""
+        job = self.get(job_id)
+        if job is not None and timeout > 0:
+            job.done.wait(min(timeout, JOB_MAX_WAIT))
+        return job
+
+    def _purge_expired(self):
+        # lock 안에서 호출
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at + self.result_ttl < now
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _worker(self, job_type):
+        handler, _, _ = self._handlers[job_type]
+        q = self._queues[job_type]
+
+        while True:
+            _, _, job = q.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = handler(job.params)
+                job.status = "done"
+            except Exception as e:
+                traceback.print_exc()
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                job.done.set()
+                q.task_done()
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, str(default)))
+
+
+job_queue = JobQueue(JOB_RESULT_TTL)
+
+job_queue.register(
+    "inpaint",
+    lambda p: {"output_url": inpaint_image(p["image_url"], p["mask_url"], p.get("mode"))},
+    concurrency=_env_int("JOB_CONCURRENCY_INPAINT", 1),
+    required=("image_url", "mask_url")
+)
+job_queue.register(
+    "ocr_auto",
+    lambda p: process_ocr(p.get("projectId"), p["image_url"]),
+    concurrency=_env_int("JOB_CONCURRENCY_OCR", 4),
+    required=("image_url",)
+)
+job_queue.register(
+    "font_recommend",
+    lambda p: process_font_recommend(p.get("projectId"), p["image_url"], p.get("granularity", "page")),
+    concurrency=_env_int("JOB_CONCURRENCY_FONT", 2),
+    required=("image_url",),
+    choices={"granularity": FONT_GRANULARITIES}
+)
+job_queue.register(
+    "render",
+    lambda p: {"output_url": render_page(
+        p["image_url"],
+        boxes=p.get("boxes"),
+        ocr_json_url=p.get("ocr_json_url"),
+        translated_json_url=p.get("translated_json_url"),
+        fmt=p.get("format", "png")
+    )},
+    concurrency=_env_int("JOB_CONCURRENCY_RENDER", 2),
+    required=("image_url",)
+)
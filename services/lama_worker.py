@@ -0,0 +1,134 @@
+"""
+LaMa 상주 인페인팅 워커.
+
+LaMa venv의 python으로 실행됨 (PYTHONPATH=LAMA_DIR).
+모델(big-lama 체크포인트)을 한 번만 로드해두고,
+stdin으로 들어오는 JSON 요청을 한 줄씩 처리한 뒤 stdout으로 한 줄 응답한다.
+
+    요청: {"image": "/.../image.png", "mask": "/.../image_mask.png", "output": "/.../out.png"}
+          또는 {"items": [{"image": ..., "mask": ..., "output": ...}, ...]}  (타일 여러 장)
+    응답: {"ok": true} 또는 {"ok": false, "error": "..."}
+
+items 요청은 padding 후 크기가 같은 것끼리 묶어서 LAMA_BATCH_SIZE 장씩 한 번에 forward 한다.
+
+이 파일은 Flask 쪽 패키지를 import 하지 않는다 (다른 venv에서 실행되기 때문).
+"""
+import os
+import sys
+import json
+import traceback
+
+# LaMa / torch 로그가 stdout으로 섞이면 프로토콜이 깨지므로
+# 원래 stdout은 응답 전용으로 빼두고, fd 1은 stderr로 돌린다.
+_protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+import numpy as np
+import torch
+import yaml
+from omegaconf import OmegaConf
+from PIL import Image
+
+from saicinpainting.training.trainers import load_checkpoint
+
+
+PAD_MODULO = 8
+BATCH_SIZE = int(os.environ.get("LAMA_BATCH_SIZE", "4"))
+
+
+def load_model(model_path, checkpoint="best.ckpt"):
+    """bin/predict.py 와 같은 방식으로 체크포인트 로드."""
+    config_path = os.path.join(model_path, "config.yaml")
+    with open(config_path, "r") as f:
+        train_config = OmegaConf.create(yaml.safe_load(f))
+
+    train_config.training_model.predict_only = True
+    train_config.visualizer.kind = "noop"
+
+    checkpoint_path = os.path.join(model_path, "models", checkpoint)
+    model = load_checkpoint(train_config, checkpoint_path, strict=False, map_location="cpu")
+    model.freeze()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    return model, device
+
+
+def _pad_to_modulo(arr, mod=PAD_MODULO):
+    # (C, H, W) → H, W를 mod 배수로 symmetric padding (predict.py의 pad_img_to_modulo와 동일)
+    _, h, w = arr.shape
+    out_h = (h + mod - 1) // mod * mod
+    out_w = (w + mod - 1) // mod * mod
+    return np.pad(arr, ((0, 0), (0, out_h - h), (0, out_w - w)), mode="symmetric")
+
+
+def _load_pair(image_path, mask_path):
+    img = np.asarray(Image.open(image_path).convert("RGB"), dtype=np.float32) / 255.0
+    img = np.transpose(img, (2, 0, 1))                                              # (3, H, W)
+    mask = np.asarray(Image.open(mask_path).convert("L"), dtype=np.float32)[None] / 255.0  # (1, H, W)
+    return img, mask
+
+
+@torch.no_grad()
+def _forward(model, device, imgs, masks):
+    """imgs: [(3, H, W)], masks: [(1, H, W)] (모두 같은 크기, padding 완료) → (N, H, W, 3) uint8"""
+    batch = {
+        "image": torch.from_numpy(np.stack(imgs)).to(device),
+        "mask": torch.from_numpy(np.stack(masks)).to(device),
+    }
+    batch["mask"] = (batch["mask"] > 0) * 1
+    batch = model(batch)
+
+    res = batch["inpainted"].permute(0, 2, 3, 1).detach().cpu().numpy()
+    return np.clip(res * 255, 0, 255).astype("uint8")
+
+
+def inpaint(model, device, image_path, mask_path, output_path):
+    inpaint_many(model, device, [{"image": image_path, "mask": mask_path, "output": output_path}])
+
+
+def inpaint_many(model, device, items):
+    # padding 후 크기가 같은 것끼리 묶음
+    groups = {}
+    for item in items:
+        img, mask = _load_pair(item["image"], item["mask"])
+        h, w = img.shape[1:]
+        img, mask = _pad_to_modulo(img), _pad_to_modulo(mask)
+        groups.setdefault(img.shape, []).append((img, mask, h, w, item["output"]))
+
+    for entries in groups.values():
+        for start in range(0, len(entries), BATCH_SIZE):
+            chunk = entries[start:start + BATCH_SIZE]
+            res = _forward(model, device, [e[0] for e in chunk], [e[1] for e in chunk])
+            for out, (_, _, h, w, output_path) in zip(res, chunk):
+                Image.fromarray(out[:h, :w]).save(output_path)
+
+
+def _reply(obj):
+    _protocol_out.write(json.dumps(obj) + "\n")
+    _protocol_out.flush()
+
+
+def main():
+    model_path = sys.argv[1]
+    model, device = load_model(model_path)
+    _reply({"ready": True, "device": str(device)})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            req = json.loads(line)
+            if "items" in req:
+                inpaint_many(model, device, req["items"])
+            else:
+                inpaint(model, device, req["image"], req["mask"], req["output"])
+            _reply({"ok": True})
+        except Exception as e:
+            traceback.print_exc()
+            _reply({"ok": False, "error": str(e)})
+
+
+if __name__ == "__main__":
+    main()
@@ -2,64 +2,334 @@ from google.cloud import vision
 from google.protobuf.json_format import MessageToDict
 from PIL import Image, ImageDraw
 import numpy as np
-import io, json, os
+import io, json, os, time
 from io import BytesIO
 from urllib.parse import urlparse
-from utils.s3 import upload_json_to_s3, upload_mask_to_s3
-import boto3
-from dotenv import load_dotenv
-load_dotenv()
-
-vision_client = vision.ImageAnnotatorClient()
-s3 = boto3.client("s3")
-BUCKET_NAME = os.environ.get("S3_BUCKET")
+from utils.s3 import upload_json_to_s3, upload_mask_to_s3, load_json, get_json_bytes
+from utils.s3_client import get_s3_client, S3_BUCKET
+from utils.blob_cache import blob_cache
+from utils.image_cache import image_cache
+from utils.ocr import parse_ocr_json
+from utils.ocr_index import build_line_index, save_line_index, index_key_for
+from utils.vision_client import get_vision_client
+from utils.ocr_tiling import plan_ocr_tiles, merge_tile_responses
+from utils.mask import build_text_mask, MASK_DILATE_PX, MASK_MERGE_PX
+from utils.ocr_dedup import ocr_dedup, content_hash
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+vision_client = get_vision_client()
+s3 = get_s3_client()
+BUCKET_NAME = S3_BUCKET
+
+# 배치 OCR: Vision batch_annotate_images 한 번에 보낼 장수 (동기 API 최대 16)
+OCR_BATCH_SIZE = min(16, int(os.environ.get("OCR_BATCH_SIZE", "16")))
+OCR_BATCH_VISION_CONCURRENCY = int(os.environ.get("OCR_BATCH_VISION_CONCURRENCY", "2"))
+OCR_BATCH_IO_WORKERS = int(os.environ.get("OCR_BATCH_IO_WORKERS", "8"))
+
+_vision_pool = ThreadPoolExecutor(max_workers=OCR_BATCH_VISION_CONCURRENCY, thread_name_prefix="ocr-vision")
+_io_pool = ThreadPoolExecutor(max_workers=OCR_BATCH_IO_WORKERS, thread_name_prefix="ocr-io")
+# 페이지 안의 JSON 단계 전용 (io pool 작업이 io pool을 기다리다 막히지 않도록 분리)
+_stage_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("OCR_STAGE_WORKERS", "4")), thread_name_prefix="ocr-stage"
+)
+
+# 세로로 긴 페이지는 겹치는 타일로 잘라서 OCR (OCR_TILE_MODE=off 로 끔)
+OCR_TILE_MODE = os.environ.get("OCR_TILE_MODE", "auto")
+OCR_TILE_TRIGGER_HEIGHT = int(os.environ.get("OCR_TILE_TRIGGER_HEIGHT", "4000"))
+OCR_TILE_HEIGHT = int(os.environ.get("OCR_TILE_HEIGHT", "2048"))
+OCR_TILE_OVERLAP = int(os.environ.get("OCR_TILE_OVERLAP", "256"))
+_tile_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("OCR_TILE_CONCURRENCY", "4")), thread_name_prefix="ocr-tile"
+)
+
+# 같은 이미지 바이트면 OCR 결과를 재사용할 때 비교하는 설정 (바뀌면 예전 결과는 miss)
+_DEDUP_CONFIG = {
+    "tile_mode": OCR_TILE_MODE,
+    "tile_trigger_height": OCR_TILE_TRIGGER_HEIGHT,
+    "tile_height": OCR_TILE_HEIGHT,
+    "tile_overlap": OCR_TILE_OVERLAP,
+    "mask_dilate_px": MASK_DILATE_PX,
+    "mask_merge_px": MASK_MERGE_PX,
+}
 
 def extract_filename(url):
     parsed = urlparse(url)
     return os.path.basename(parsed.path)
 
-def process_ocr(projectId, image_url):
-    filename = extract_filename(image_url)
 
-    # 1) S3 이미지 다운로드
-    response = s3.get_object(
-        Bucket=BUCKET_NAME,
-        Key=f"images/{filename}"
-    )
-    img_bytes = response["Body"].read()
+# ---------- process_ocr 단계 (단건 / 배치 공용) ----------
 
-    image = vision.Image(content=img_bytes)
+def _fetch_image(filename):
+    """S3 이미지 다운로드 (로컬 blob 캐시 경유): (key, bytes, etag)"""
+    image_key = f"images/{filename}"
+    img_bytes, img_etag = blob_cache.get(image_key)
+    return image_key, img_bytes, img_etag
 
-    # 2) Vision OCR
-    ocr_response = vision_client.text_detection(image=image)
-    annotations = ocr_response.text_annotations
-    full_json = MessageToDict(ocr_response.full_text_annotation._pb)
 
-    # 3) OCR JSON 업로드
+def _needs_tiling(img_bytes):
+    if OCR_TILE_MODE == "off":
+        return False
+    # 헤더만 읽어서 크기 확인 (디코딩 없음)
+    return Image.open(BytesIO(img_bytes)).height > OCR_TILE_TRIGGER_HEIGHT
+
+
+def _tiled_text_detection(image_key, img_bytes, img_etag):
+    """긴 페이지: 겹치는 타일별 Vision OCR을 동시에 → 페이지 좌표로 합친 응답"""
+    img = image_cache.get(image_key, "RGB", (img_bytes, img_etag))
+    tiles = plan_ocr_tiles(img.height, OCR_TILE_HEIGHT, OCR_TILE_OVERLAP)
+
+    def detect(tile):
+        buf = BytesIO()
+        img.crop((0, tile[0], img.width, tile[1])).save(buf, format="PNG", compress_level=1)
+        res = vision_client.text_detection(vision.Image(content=buf.getvalue()))
+        if res.error.message:
+            raise Exception(f"vision failed: {res.error.message}")
+        return res
+
+    responses = list(_tile_pool.map(detect, tiles))
+    print(f"[ocr_service] tiled OCR {image_key}: {len(tiles)} tiles")
+    return merge_tile_responses(tiles, responses, img.width, img.height)
+
+
+def _text_detection(image_key, img_bytes, img_etag):
+    if _needs_tiling(img_bytes):
+        return _tiled_text_detection(image_key, img_bytes, img_etag)
+    return vision_client.text_detection(vision.Image(content=img_bytes))
+
+
+def _output_keys(filename):
     json_key = f"ocr_results/{filename}.json"
-    json_url = upload_json_to_s3(full_json, json_key)
+    return {
+        "json": json_key,
+        "index": index_key_for(json_key),
+        "mask": f"mask/{filename}_mask.png",
+    }
+
+
+def _s3_url(key):
+    return f"https://{BUCKET_NAME}.s3.amazonaws.com/{key}"
+
+
+def _restore_duplicate(projectId, image_url, filename, sha, timings=None):
+    """
+    같은 바이트로 이미 OCR 한 결과를 S3 서버 측 복사로 가져옴 (Vision 호출 없음).
+    복사에 실패하면 None → 호출하는 쪽은 평소처럼 Vision OCR
+    """
+    timings = {} if timings is None else timings
+    keys = _output_keys(filename)
+    if not _stage(timings, "dedup_copy_ms", ocr_dedup.restore, sha, keys):
+        return None
+    return {
+        "projectId": projectId,
+        "image_url": image_url,
+        "ocr_json_url": _s3_url(keys["json"]),
+        "mask_image_url": _s3_url(keys["mask"]),
+        "dedup": True,
+        "timings": timings
+    }
+
+
+def _register_duplicate(sha, filename, timings=None):
+    """
+    새로 만든 결과물을 dedup 사본으로 등록.
+    응답 전에 끝냄 - 응답 뒤에 복사하면 그 사이 /select 로 수정된 JSON·마스크가 사본으로 들어갈 수 있음
+    """
+    timings = {} if timings is None else timings
+    _stage(timings, "dedup_register_ms", ocr_dedup.register, sha, _DEDUP_CONFIG, filename, _output_keys(filename))
+
+
+def _stage(timings, name, fn, *args):
+    """fn(*args) 실행 시간을 timings[name] (ms)에 기록"""
+    t0 = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+
 
-    # 4) 마스크 생성
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    mask = Image.new('L', img.size, 0)
-    draw = ImageDraw.Draw(mask)
+def _store_json_stage(full_json, json_key, timings):
+    # OCR JSON 업로드 (compact + gzip)
+    json_url = _stage(timings, "json_upload_ms", upload_json_to_s3, full_json, json_key)
 
-    for txt in annotations[1:]:
-        vertices = [(v.x, v.y) for v in txt.bounding_poly.vertices]
-        draw.polygon(vertices, fill=255)
+    # 줄 index sidecar 저장 (translate / reinsert 에서 원본 JSON 대신 읽음)
+    idx = _stage(timings, "index_build_ms", lambda: build_line_index(parse_ocr_json(full_json)))
+    _stage(timings, "index_upload_ms", save_line_index, idx, json_key)
+    return json_url
+
+
+def _store_ocr_outputs(projectId, image_url, filename, img_bytes, ocr_response, timings=None):
+    """
+    Vision 응답 이후 단계.
+        [stage pool] JSON 직렬화·업로드 → 줄 index 생성·업로드
+        [현재 스레드] 마스크 생성 (polygon 일괄 채우기 + closing/dilation) → PNG 인코딩·업로드
+    두 갈래는 서로 독립이라 동시에 진행하고, 단계별 시간(ms)을 timings에 기록.
+    """
+    timings = {} if timings is None else timings
+    annotations = ocr_response.text_annotations
+    full_json = _stage(timings, "to_dict_ms", MessageToDict, ocr_response.full_text_annotation._pb)
+
+    # 3) OCR JSON + 줄 index (별도 스레드)
+    json_key = f"ocr_results/{filename}.json"
+    json_future = _stage_pool.submit(_store_json_stage, full_json, json_key, timings)
+
+    # 4) 마스크 생성 (페이지 크기는 헤더만 읽음 - 디코딩 불필요)
+    size = Image.open(BytesIO(img_bytes)).size
+    mask = _stage(timings, "mask_draw_ms", build_text_mask, size, annotations)
 
     # 5) 마스크 S3 업로드
     mask_key = f"mask/{filename}_mask.png"
-    mask_url = upload_mask_to_s3(mask, mask_key)
+    mask_url = _stage(timings, "mask_upload_ms", upload_mask_to_s3, mask, mask_key)
+
+    json_url = json_future.result()
 
     return {
         "projectId": projectId,
         "image_url": image_url,
         "ocr_json_url": json_url,
-        "mask_image_url": mask_url
+        "mask_image_url": mask_url,
+        "timings": timings
     }
 
 
+def process_ocr(projectId, image_url):
+    filename = extract_filename(image_url)
+    timings = {}
+    t0 = time.perf_counter()
+
+    # 1) S3 이미지 다운로드 (로컬 blob 캐시 경유)
+    image_key, img_bytes, img_etag = _stage(timings, "download_ms", _fetch_image, filename)
+
+    # 2) 같은 바이트를 이미 OCR 했으면 결과만 복사
+    sha = _stage(timings, "hash_ms", content_hash, img_bytes)
+    if _stage(timings, "dedup_lookup_ms", ocr_dedup.lookup, sha, _DEDUP_CONFIG) is not None:
+        result = _restore_duplicate(projectId, image_url, filename, sha, timings)
+        if result is not None:
+            timings["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            return result
+
+    # 3) Vision OCR (긴 페이지는 타일 OCR)
+    ocr_response = _stage(timings, "vision_ms", _text_detection, image_key, img_bytes, img_etag)
+
+    # 4~6) JSON / index / 마스크
+    result = _store_ocr_outputs(projectId, image_url, filename, img_bytes, ocr_response, timings)
+    _register_duplicate(sha, filename, timings)
+    timings["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+
+def _fetch_page(filename):
+    """다운로드 + 해시 + dedup 조회: (fetched, sha, hit)"""
+    fetched = _fetch_image(filename)
+    sha = content_hash(fetched[1])
+    return fetched, sha, ocr_dedup.lookup(sha, _DEDUP_CONFIG) is not None
+
+
+def _annotate_chunk(chunk):
+    """
+    chunk: [(index, image_url)]
+    다운로드(+ dedup 조회)는 io pool에서 병렬로, Vision은 batch_annotate_images 한 번.
+    (이미 OCR 한 바이트는 Vision에서 빼고, 긴 페이지는 batch에서 빼고 타일 OCR)
+    반환: [page dict] (index, image_url, filename, fetched, sha, dedup, response, error)
+    """
+    filenames = [extract_filename(url) for _, url in chunk]
+    fetch_futures = [_io_pool.submit(_fetch_page, name) for name in filenames]
+
+    pages = []
+    for (index, url), name, fut in zip(chunk, filenames, fetch_futures):
+        page = {"index": index, "image_url": url, "filename": name,
+                "fetched": None, "sha": None, "dedup": False, "response": None, "error": None}
+        try:
+            page["fetched"], page["sha"], page["dedup"] = fut.result()
+        except Exception as e:
+            page["error"] = f"download failed: {e}"
+        pages.append(page)
+
+    ready = []
+    for p in pages:
+        if p["fetched"] is None or p["dedup"]:
+            continue
+        if not _needs_tiling(p["fetched"][1]):
+            ready.append(p)
+            continue
+        try:
+            p["response"] = _tiled_text_detection(*p["fetched"])
+        except Exception as e:
+            p["error"] = f"vision failed: {e}"
+
+    if ready:
+        feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+        requests = [
+            vision.AnnotateImageRequest(image=vision.Image(content=p["fetched"][1]), features=[feature])
+            for p in ready
+        ]
+        try:
+            responses = vision_client.batch_annotate_images(requests=requests).responses
+        except Exception as e:
+            for p in ready:
+                p["error"] = f"vision failed: {e}"
+        else:
+            for p, res in zip(ready, responses):
+                if res.error.message:
+                    p["error"] = f"vision failed: {res.error.message}"
+                else:
+                    p["response"] = res
+
+    return pages
+
+
+def _store_page(projectId, page):
+    url, name, sha = page["image_url"], page["filename"], page["sha"]
+    result = _restore_duplicate(projectId, url, name, sha) if page["dedup"] else None
+    if result is None:
+        if page["response"] is None:
+            # dedup 복사 실패 → 이 페이지만 따로 Vision OCR
+            page["response"] = _text_detection(*page["fetched"])
+        result = _store_ocr_outputs(projectId, url, name, page["fetched"][1], page["response"])
+        _register_duplicate(sha, name, result["timings"])
+    result["index"] = page["index"]
+    return result
+
+
+def process_ocr_batch(projectId, image_urls):
+    """
+    에피소드 전체 OCR. 페이지가 끝나는 순서대로 결과 dict를 yield 한다.
+    - OCR_BATCH_SIZE 장씩 batch_annotate_images (동시에 OCR_BATCH_VISION_CONCURRENCY 묶음)
+    - S3 다운로드 / JSON·마스크 업로드는 OCR_BATCH_IO_WORKERS 크기 pool에서 Vision 호출과 겹쳐서 진행
+    - 이미 OCR 한 바이트의 페이지는 Vision 없이 결과 복사 ("dedup": true)
+    실패한 페이지는 {"index", "image_url", "error"} 로 나옴.
+    """
+    indexed = list(enumerate(image_urls))
+    chunks = [indexed[i:i + OCR_BATCH_SIZE] for i in range(0, len(indexed), OCR_BATCH_SIZE)]
+
+    pending = {_vision_pool.submit(_annotate_chunk, chunk): ("chunk", chunk) for chunk in chunks}
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            kind, info = pending.pop(fut)
+
+            if kind == "chunk":
+                try:
+                    pages = fut.result()
+                except Exception as e:
+                    pages = [{"index": index, "image_url": url, "error": str(e)} for index, url in info]
+                for page in pages:
+                    if page["error"] is not None:
+                        yield {"index": page["index"], "image_url": page["image_url"], "error": page["error"]}
+                    else:
+                        pending[_io_pool.submit(_store_page, projectId, page)] = ("page", page)
+
+            else:
+                try:
+                    yield fut.result()
+                except Exception as e:
+                    yield {"index": info["index"], "image_url": info["image_url"], "error": f"store failed: {e}"}
+
+
+def ocr_dedup_stats():
+    return ocr_dedup.stats()
+
+
 def _get_ocr_json_key(image_url: str) -> str:
     """auto에서 저장한 OCR 결과 JSON의 S3 key."""
     filename = extract_filename(image_url)
@@ -75,9 +345,7 @@ def _append_manual_text_to_json(image_url: str, item: dict):
     json_key = _get_ocr_json_key(image_url)
 
     try:
-        obj = s3.get_object(Bucket=BUCKET_NAME, Key=json_key)
-        data_str = obj["Body"].read().decode("utf-8")
-        data = json.loads(data_str)
+        data = load_json(json_key)
     except s3.exceptions.NoSuchKey:
         # auto를 아직 안 돌렸거나 JSON이 없는 경우
         data = {}
@@ -91,6 +359,9 @@ def _append_manual_text_to_json(image_url: str, item: dict):
     # 기존 upload_json_to_s3 재사용 (full_json 저장 방식 그대로 유지)
     upload_json_to_s3(data, json_key)
 
+    # 줄 index도 manualTexts 포함해서 다시 저장
+    save_line_index(build_line_index(parse_ocr_json(data)), json_key)
+
 
 # def process_ocr_select(projectId, image_url, bbox):
 #     """
@@ -155,13 +426,8 @@ def _append_manual_text_to_json(image_url: str, item: dict):
 def process_ocr_select(projectId, image_url, bbox):
     filename = extract_filename(image_url)
 
-    # --- 1) S3 이미지 다운로드 ---
-    response = s3.get_object(
-        Bucket=BUCKET_NAME,
-        Key=f"images/{filename}"
-    )
-    img_bytes = response["Body"].read()
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    # --- 1) S3 이미지 (디코딩 캐시 경유, 같은 ETag면 재디코딩 없이 crop만) ---
+    img = image_cache.get(f"images/{filename}")
 
     # --- 2) bbox 계산 ---
     xs = [p["x"] for p in bbox]
@@ -201,25 +467,15 @@ def process_ocr_select(projectId, image_url, bbox):
         mask_key = f"mask/{filename}_mask.png"
 
         # (1) 기존 마스크 다운로드
-        mask_obj = s3.get_object(Bucket=BUCKET_NAME, Key=mask_key)
-        mask_bytes = mask_obj["Body"].read()
+        mask_bytes = blob_cache.get_bytes(mask_key)
         mask_img = Image.open(io.BytesIO(mask_bytes)).convert("L")
 
         # (2) 선택 bbox를 흰색(255)로 채우기
         draw = ImageDraw.Draw(mask_img)
         draw.rectangle([min_x, min_y, max_x, max_y], fill=255)
 
-        # (3) 수정된 마스크 다시 S3 업로드
-        out_buf = io.BytesIO()
-        mask_img.save(out_buf, format="PNG")
-        out_buf.seek(0)
-
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=mask_key,
-            Body=out_buf.getvalue(),
-            ContentType="image/png"
-        )
+        # (3) 수정된 마스크 다시 S3 업로드 (캐시도 같이 갱신)
+        upload_mask_to_s3(mask_img, mask_key)
 
     except Exception as e:
         print("선택 마스크 처리 오류:", e)
@@ -237,8 +493,7 @@ def download_ocr_json_file(image_url: str):
     Flask send_file로 내려보낼 수 있게 (file-like, filename) 반환
     """
     json_key = _get_ocr_json_key(image_url)  # ocr_results/wow.png.json 이런 형태
-    obj = s3.get_object(Bucket=BUCKET_NAME, Key=json_key)
-    data_bytes = obj["Body"].read()
+    data_bytes = get_json_bytes(json_key)    # gzip 저장분은 풀어서 내려줌
 
     file_obj = BytesIO(data_bytes)
     file_obj.seek(0)
@@ -1,145 +1,41 @@
-import boto3
-import json
-import os
-import math
 import uuid
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+from utils.s3_client import get_s3_client, extract_s3_key, S3_BUCKET
+from utils.s3 import load_json
+from utils.ocr_index import load_line_index
+from utils.text_fit import fit_text
 
-S3_BUCKET = os.environ.get("S3_BUCKET")
-AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
-
-s3 = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY")
-)
-
-
-def extract_s3_key(url: str):
-    after = url.split(".amazonaws.com/", 1)[1]
-    return after.split("?", 1)[0]
+s3 = get_s3_client()
 
 
 def load_json_from_s3_url(url: str):
-    key = extract_s3_key(url)
-    obj = s3.get_object(Bucket=S3_BUCKET, Key=key)
-    body = obj["Body"].read().decode("utf-8")
-    return json.loads(body)
-
-
-def compute_raw_angle(vertices):
-    clean = [v for v in vertices if "x" in v and "y" in v]
-    if len(clean) < 4:
-        return 0
-    pts = [(v["x"], v["y"]) for v in clean]
-    edges = [(pts[0], pts[1]), (pts[1], pts[2]), (pts[2], pts[3]), (pts[3], pts[0])]
-    max_len, longest = -1, None
-
-    for p1, p2 in edges:
-        dx = p2[0] - p1[0]
-        dy = p2[1] - p1[1]
-        length = dx * dx + dy * dy
-        if length > max_len:
-            max_len = length
-            longest = (p1, p2)
-
-    (x1, y1), (x2, y2) = longest
-    return math.degrees(math.atan2(y2 - y1, x2 - x1))
-
-
-def decide_orientation(vertices):
-    xs = [v["x"] for v in vertices if "x" in v]
-    ys = [v["y"] for v in vertices if "y" in v]
-
-    w = max(xs) - min(xs)
-    h = max(ys) - min(ys)
-    raw = compute_raw_angle(vertices)
-
-    if w > h * 1.3:
-        return 0, "horizontal"
-    if h > w * 1.3:
-        return -90, "vertical"
-
-    ang = raw
-    if ang < -90:
-        ang += 180
-    if ang > 90:
-        ang -= 180
-    return ang, "diagonal"
-
-
-def compute_symbol_height(symbol_vertices_list):
-    heights = []
-    for verts in symbol_vertices_list:
-        clean = [v for v in verts if "x" in v and "y" in v]
-        if len(clean) < 2:
-            continue
-        ys = [v["y"] for v in clean]
-        heights.append(max(ys) - min(ys))
-    return int((sum(heights) / len(heights)) * 0.9) if heights else 20
-
+    return load_json(extract_s3_key(url))
 
 
 def generate_boxes_only(ocr_json_url, translated_json_url):
 
-
-    ocr = load_json_from_s3_url(ocr_json_url)
+    # OCR 원본 JSON 대신 미리 계산된 줄 index 사용 (없으면 만들어서 저장)
+    ocr = load_line_index(ocr_json_url)
     translated = load_json_from_s3_url(translated_json_url)
 
-    lines = []
-    buf_text, buf_vertices, buf_symbols = "", [], []
-
-    for page in ocr["pages"]:
-        for block in page.get("blocks", []):
-            for para in block.get("paragraphs", []):
-                for word in para.get("words", []):
-                    for sym in word.get("symbols", []):
-                        buf_text += sym["text"]
-                        buf_vertices += sym["boundingBox"]["vertices"]
-                        buf_symbols.append(sym["boundingBox"]["vertices"])
-
-                        br = sym.get("property", {}).get("detectedBreak", {})
-                        if br.get("type") == "LINE_BREAK":
-                            if buf_text.strip():
-                                lines.append({
-                                    "text": buf_text.strip(),
-                                    "vertices": buf_vertices.copy(),
-                                    "symbols": [s.copy() for s in buf_symbols]
-                                })
-                            buf_text, buf_vertices, buf_symbols = "", [], []
-
-    if buf_text.strip():
-        lines.append({
-            "text": buf_text.strip(),
-            "vertices": buf_vertices.copy(),
-            "symbols": [s.copy() for s in buf_symbols]
-        })
-
     boxes = []
-    count = min(len(lines), len(translated))
-    font_path = "/usr/share/fonts/truetype/nanum/NanumGothic.ttf"
+    count = min(len(ocr), len(translated))
 
     for i in range(count):
-        original = lines[i]["text"]
+        original = ocr.layout_texts[i]
         translated_text = translated[i]["translated"]
-        verts = lines[i]["vertices"]
-        symbols = lines[i]["symbols"]
 
-        xs = [v["x"] for v in verts if "x" in v]
-        ys = [v["y"] for v in verts if "y" in v]
-        cx, cy = sum(xs) / len(xs), sum(ys) / len(ys)
+        x, y, width, height, angle, orientation, symbol_height = ocr.line_geometry(i)
 
-        angle, orientation = decide_orientation(verts)
-        font_size = max(12, compute_symbol_height(symbols))
+        font_size = max(12, symbol_height)
         if orientation == "vertical":
             font_size = int(font_size * 0.85)
 
-        x = min(xs)
-        y = min(ys)
-        width = max(xs) - min(xs)
-        height = max(ys) - min(ys)
+        # 번역문을 실제로 재서 박스에 들어가는 크기 / 줄바꿈 계산
+        # (세로 박스는 -90도 회전해서 그리므로 가로/세로를 바꿔서 맞춤)
+        if orientation == "vertical":
+            font_size, text_lines = fit_text(translated_text, height, width, font_size)
+        else:
+            font_size, text_lines = fit_text(translated_text, width, height, font_size)
 
         boxes.append({
             "id": str(uuid.uuid4()),
@@ -151,10 +47,11 @@ def generate_boxes_only(ocr_json_url, translated_json_url):
             "height": height,
             "angle": angle,
             "fontSize": font_size,
+            "lines": text_lines,
             "color": "#000000"
         })
 
-    manual_items = ocr.get("manualTexts", [])
+    manual_items = ocr.manual_texts
     manual_index = 0  # 실제 번역 index 맞추기 위해 필요
 
     for item in manual_items:
@@ -187,6 +84,7 @@ def generate_boxes_only(ocr_json_url, translated_json_url):
 
         angle = 0  # manualTexts는 모두 직사각형
         font_size = max(12, int(height * 0.9))
+        font_size, text_lines = fit_text(translated_text, width, height, font_size)
 
         boxes.append({
             "id": str(uuid.uuid4()),
@@ -198,6 +96,7 @@ def generate_boxes_only(ocr_json_url, translated_json_url):
             "height": height,
             "angle": angle,
             "fontSize": font_size,
+            "lines": text_lines,
             "color": "#000000"
         })
 
@@ -0,0 +1,148 @@
+"""
+최종 렌더링: 인페인팅 결과(_inpaint.png) 위에 번역문 박스를 직접 그려서 S3에 저장.
+
+- 박스마다 텍스트 patch(RGBA)를 한 번만 그리고 회전 (layout 캐시)
+- 페이지를 가로 띠(RENDER_TILE_HEIGHT) 단위로 잘라서 patch를 붙이고
+  PNG는 띠 단위로 바로 인코딩 → S3 multipart upload 로 흘려보냄
+  (결과 이미지 전체를 메모리에 다시 만들지 않음)
+"""
+import os
+import threading
+from io import BytesIO
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from services.reinsert_service import generate_boxes_only
+from utils.s3 import S3MultipartWriter
+from utils.s3_client import extract_s3_key, S3_BUCKET, AWS_REGION
+from utils.blob_cache import blob_cache
+from utils.png_stream import PngStreamWriter
+from utils.text_fit import FONT_PATH, LINE_HEIGHT, fit_text, get_font, text_width, font_available
+
+RENDER_TILE_HEIGHT = int(os.environ.get("RENDER_TILE_HEIGHT", "1024"))
+RENDER_PATCH_CACHE_SIZE = int(os.environ.get("RENDER_PATCH_CACHE_SIZE", "2048"))
+
+_patch_cache = OrderedDict()    # layout key -> 회전된 RGBA patch
+_patch_lock = threading.Lock()
+
+
+def _draw_text_patch(lines, font_size, width, height, color):
+    """(width × height) 투명 patch 가운데에 줄들을 그림."""
+    if font_available(FONT_PATH):
+        font = get_font(FONT_PATH, font_size)
+        measure = lambda s: text_width(s, FONT_PATH, font_size)
+    else:
+        font = ImageFont.load_default()
+        measure = font.getlength
+    line_h = font_size * LINE_HEIGHT
+    total_h = line_h * len(lines)
+
+    patch = Image.new("RGBA", (max(1, int(width)), max(1, int(height), int(total_h))), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(patch)
+
+    top = (patch.height - total_h) / 2
+    for i, line in enumerate(lines):
+        line_w = measure(line)
+        left = (patch.width - line_w) / 2
+        draw.text((left, top + i * line_h), line, font=font, fill=color)
+
+    return patch
+
+
+def _box_patch(box):
+    """박스 하나의 텍스트 patch (회전 포함). 같은 layout이면 캐시 재사용."""
+    text = box.get("translated_text") or ""
+    width, height = box["width"], box["height"]
+    angle = box.get("angle") or 0
+    color = box.get("color") or "#000000"
+    font_size = int(box.get("fontSize") or 12)
+    lines = box.get("lines")
+
+    vertical = angle == -90
+    draw_w, draw_h = (height, width) if vertical else (width, height)
+    if not lines:
+        font_size, lines = fit_text(text, draw_w, draw_h, font_size)
+
+    key = (tuple(lines), font_size, draw_w, draw_h, angle, color)
+    with _patch_lock:
+        patch = _patch_cache.get(key)
+        if patch is not None:
+            _patch_cache.move_to_end(key)
+            return patch
+
+    patch = _draw_text_patch(lines, font_size, draw_w, draw_h, color)
+    if angle:
+        # 프론트(캔버스)의 rotation은 시계방향, PIL rotate는 반시계방향
+        patch = patch.rotate(-angle, resample=Image.BICUBIC, expand=True)
+
+    with _patch_lock:
+        _patch_cache[key] = patch
+        while len(_patch_cache) > RENDER_PATCH_CACHE_SIZE:
+            _patch_cache.popitem(last=False)
+    return patch
+
+
+def _place_patches(boxes):
+    """[(left, top, patch)] : 박스 중심에 patch 중심을 맞춤"""
+    placed = []
+    for box in boxes:
+        if not (box.get("translated_text") or "").strip():
+            continue
+        patch = _box_patch(box)
+        cx = box["x"] + box["width"] / 2
+        cy = box["y"] + box["height"] / 2
+        placed.append((int(round(cx - patch.width / 2)), int(round(cy - patch.height / 2)), patch))
+    return placed
+
+
+def _render_band(base, top, bottom, placed):
+    band = base.crop((0, top, base.width, bottom))
+    for left, ptop, patch in placed:
+        if ptop < bottom and ptop + patch.height > top:
+            band.paste(patch, (left, ptop - top), patch)
+    return band
+
+
+def render_page(image_url, boxes=None, ocr_json_url=None, translated_json_url=None, fmt="png"):
+    """
+    image_url: 인페인팅 결과 이미지 URL (output/{base}_inpaint.png)
+    boxes: /api/reinsert 결과 박스 목록 (없으면 ocr_json_url + translated_json_url로 생성)
+    반환: 렌더링된 이미지 S3 URL (rendered/{base}_render.{png|webp})
+    """
+    fmt = (fmt or "png").lower()
+    if fmt not in ("png", "webp"):
+        raise ValueError(f"unsupported format: {fmt}")
+
+    if boxes is None:
+        if not ocr_json_url or not translated_json_url:
+            raise ValueError("boxes or (ocr_json_url, translated_json_url) required")
+        boxes = generate_boxes_only(ocr_json_url, translated_json_url)
+
+    image_key = extract_s3_key(image_url)
+    base_name = image_key.split("/")[-1].rsplit(".", 1)[0]
+    if base_name.endswith("_inpaint"):
+        base_name = base_name[:-len("_inpaint")]
+    output_key = f"rendered/{base_name}_render.{fmt}"
+
+    # 렌더 입력은 요청 안에서만 디코딩 (OCR/폰트용 공유 디코딩 캐시에 긴 페이지를 남기지 않음)
+    base = Image.open(BytesIO(blob_cache.get_bytes(image_key))).convert("RGB")
+    placed = _place_patches(boxes)
+
+    if fmt == "png":
+        # 띠 단위로 그리고 → 바로 PNG 인코딩 → multipart upload
+        with S3MultipartWriter(output_key, "image/png") as out:
+            writer = PngStreamWriter(out, base.width, base.height, mode="RGB")
+            for top in range(0, base.height, RENDER_TILE_HEIGHT):
+                bottom = min(base.height, top + RENDER_TILE_HEIGHT)
+                band = _render_band(base, top, bottom, placed)
+                writer.write_rows(np.asarray(band))
+            writer.close()
+    else:
+        # WebP는 PIL에서 스트리밍 인코딩이 안 되므로 페이지 단위로 인코딩 후 multipart upload
+        page = _render_band(base, 0, base.height, placed)
+        with S3MultipartWriter(output_key, "image/webp") as out:
+            page.save(out, format="WEBP", quality=90, method=4)
+
+    return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{output_key}"
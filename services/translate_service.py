@@ -1,6 +1,10 @@
-from utils.s3_1 import load_json_from_s3, save_json_to_s3
-from utils.ocr import detect_language_from_ocr, extract_lines_from_ocr
-from utils.papago import papago_translate
+from utils.s3_1 import save_json_to_s3
+from utils.ocr_index import load_line_index
+from utils.papago import papago_translate_batch
+import os
+
+# 0이면 줄 묶기 없이 줄 단위 요청만 동시에 보냄
+PAPAGO_PACK_LINES = os.environ.get("PAPAGO_PACK_LINES", "1") != "0"
 
 def process_translation(body):
     ocr_url = body["ocrJsonUrl"]
@@ -8,9 +12,10 @@ def process_translation(body):
     forced_source = body.get("forcedSource")
     target = body.get("target", "ko")
 
-    full_json = load_json_from_s3(ocr_url)
+    # OCR 원본 JSON 대신 미리 계산된 줄 index 사용 (없으면 만들어서 저장)
+    ocr = load_line_index(ocr_url)
 
-    lang = detect_language_from_ocr(full_json)
+    lang = ocr.language
     source = forced_source or lang or "auto"
 
     print(source)
@@ -24,9 +29,9 @@ def process_translation(body):
     print(source)
     print (target)
 
-    lines = extract_lines_from_ocr(full_json)
+    lines = list(ocr.text_lines)
 
-    manuals = full_json.get("manualTexts", [])
+    manuals = ocr.manual_texts
     for item in manuals:
         text = (item.get("text") or "").strip()
         if text:        # 빈 문자열은 제외
@@ -45,26 +50,23 @@ def process_translation(body):
     #         "original": line,
     #         "translated": translated
     #     })
-    result = []
-    for line in lines:
-        trimmed = line.strip()
-
-        if not any(ch.isalnum() for ch in trimmed):  
-            result.append({
-                "original": line,
-                "translated": line
-            })
-            continue
-
-        try:
-            translated = papago_translate(line, source, target)
-        except Exception as e:
-            print(f"번역 실패: {e}")
-            translated = line
+    # 번역이 필요한 줄만 모아서 Papago 배치 번역
+    # (글자 수 제한 단위로 묶고, 요청들은 스레드 풀에서 동시에 보냄)
+    to_translate = [
+        i for i, line in enumerate(lines)
+        if any(ch.isalnum() for ch in line.strip())
+    ]
+    translated_lines = papago_translate_batch(
+        [lines[i] for i in to_translate], source, target,
+        pack=body.get("packLines", PAPAGO_PACK_LINES)
+    )
 
+    translated_map = dict(zip(to_translate, translated_lines))
+    result = []
+    for i, line in enumerate(lines):
         result.append({
             "original": line,
-            "translated": translated
+            "translated": translated_map.get(i, line)
         })
 
     translated_url = save_json_to_s3(result, img_url)
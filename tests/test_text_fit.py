@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from utils.text_fit import FONT_PATH, MIN_FONT_SIZE, fit_text
+
+_FONTS = [FONT_PATH, "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"]
+FONT = next((p for p in _FONTS if os.path.exists(p)), None)
+
+pytestmark = pytest.mark.skipif(FONT is None, reason="no TrueType font available")
+
+
+def test_single_line_that_fits_keeps_max_size():
+    assert fit_text("Hello", 200, 20, 20, font_path=FONT) == (20, ["Hello"])
+
+
+def test_wraps_and_shrinks_to_fit_height():
+    size, lines = fit_text("Hi there friend", 60, 40, 20, font_path=FONT)
+    assert lines == ["Hi there", "friend"]
+    assert MIN_FONT_SIZE <= size < 20
+
+
+def test_overflow_stays_at_min_size_floor():
+    size, _ = fit_text("Hi there friend", 60, 10, 20, font_path=FONT)
+    assert size == MIN_FONT_SIZE == 12
@@ -0,0 +1,226 @@
+"""
+S3 객체 read-through 로컬 디스크 캐시.
+
+- key: (bucket, key), 캐시된 ETag로 조건부 GET(If-None-Match) → 304면 로컬 파일 사용
+- 전체 바이트 수 기준 LRU eviction (BLOB_CACHE_MAX_BYTES)
+- 우리 코드가 S3에 덮어쓰는 객체는 put()으로 올려서 캐시도 같이 갱신 (write-through)
+
+디스크 구조: {BLOB_CACHE_DIR}/{sha1(bucket/key)}.blob + .json(메타: bucket, key, etag, size)
+"""
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from botocore.exceptions import ClientError
+from utils.s3_client import get_s3_client, S3_BUCKET
+
+BLOB_CACHE_ENABLED = os.environ.get("BLOB_CACHE", "1") != "0"
+BLOB_CACHE_DIR = os.environ.get("BLOB_CACHE_DIR", "/tmp/chowol_blob_cache")
+BLOB_CACHE_MAX_BYTES = int(os.environ.get("BLOB_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+
+def _is_not_modified(e):
+    err = e.response.get("Error", {})
+    status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return status == 304 or err.get("Code") in ("304", "NotModified")
+
+
+class BlobCache:
+
+    def __init__(self, s3, bucket, cache_dir, max_bytes, enabled=True):
+        self.s3 = s3
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._index = OrderedDict()   # name -> {"bucket", "key", "etag", "size"}
+        self._total = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+        if self.enabled:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self._load_index()
+            except OSError as e:
+                print("[blob_cache] WARNING: cache disabled:", e)
+                self.enabled = False
+
+    # ---------- 디스크 index ----------
+
+    def _name(self, key, bucket):
+        return hashlib.sha1(f"{bucket}/{key}".encode("utf-8")).hexdigest()
+
+    def _blob_path(self, name):
+        return os.path.join(self.cache_dir, name + ".blob")
+
+    def _meta_path(self, name):
+        return os.path.join(self.cache_dir, name + ".json")
+
+    def _load_index(self):
+        # 서버 재시작 후에도 캐시 재사용 (mtime 오래된 순 = LRU 순서)
+        entries = []
+        for fname in os.listdir(self.cache_dir):
+            if not fname.endswith(".json"):
+                continue
+            name = fname[:-5]
+            try:
+                with open(self._meta_path(name)) as f:
+                    meta = json.load(f)
+                mtime = os.path.getmtime(self._blob_path(name))
+            except (OSError, ValueError):
+                self._remove_files(name)
+                continue
+            entries.append((mtime, name, meta))
+
+        for _, name, meta in sorted(entries):
+            self._index[name] = meta
+            self._total += meta["size"]
+        self._evict()
+
+    def _remove_files(self, name):
+        for path in (self._blob_path(name), self._meta_path(name)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _write_atomic(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _store(self, key, bucket, etag, body):
+        name = self._name(key, bucket)
+        meta = {"bucket": bucket, "key": key, "etag": etag, "size": len(body)}
+
+        self._write_atomic(self._blob_path(name), body)
+        self._write_atomic(self._meta_path(name), json.dumps(meta).encode("utf-8"))
+
+        with self._lock:
+            old = self._index.pop(name, None)
+            if old is not None:
+                self._total -= old["size"]
+            self._index[name] = meta
+            self._total += meta["size"]
+            self._evict()
+
+    def _evict(self):
+        # lock 안에서 호출
+        while self._total > self.max_bytes and self._index:
+            name, meta = self._index.popitem(last=False)
+            self._total -= meta["size"]
+            self._remove_files(name)
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _lookup(self, key, bucket):
+        name = self._name(key, bucket)
+        with self._lock:
+            meta = self._index.get(name)
+            if meta is None:
+                return None, None
+            self._index.move_to_end(name)
+        try:
+            with open(self._blob_path(name), "rb") as f:
+                body = f.read()
+            os.utime(self._blob_path(name))
+        except OSError:
+            self.invalidate(key, bucket)
+            return None, None
+        return meta, body
+
+    # ---------- 공개 API ----------
+
+    def get(self, key, bucket=None):
+        """
+        S3 객체 바이트와 ETag 반환: (bytes, etag).
+        캐시에 있으면 If-None-Match로 조건부 GET, 304면 디스크 내용 그대로 사용.
+        """
+        bucket = bucket or self.bucket
+
+        if not self.enabled:
+            obj = self.s3.get_object(Bucket=bucket, Key=key)
+            return obj["Body"].read(), obj.get("ETag")
+
+        meta, cached = self._lookup(key, bucket)
+
+        try:
+            if meta is not None:
+                obj = self.s3.get_object(Bucket=bucket, Key=key, IfNoneMatch=meta["etag"])
+            else:
+                obj = self.s3.get_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if meta is not None and _is_not_modified(e):
+                self._count("hits")
+                return cached, meta["etag"]
+            if meta is not None:
+                self.invalidate(key, bucket)
+            raise
+
+        body = obj["Body"].read()
+        etag = obj.get("ETag")
+        self._count("revalidated" if meta is not None else "misses")
+        self._store(key, bucket, etag, body)
+        return body, etag
+
+    def get_bytes(self, key, bucket=None):
+        return self.get(key, bucket)[0]
+
+    def put(self, key, body, content_type, bucket=None, **extra):
+        """S3 put_object 후 같은 바이트로 캐시도 갱신 (write-through). ETag 반환."""
+        bucket = bucket or self.bucket
+        if hasattr(body, "getvalue"):
+            body = body.getvalue()
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        res = self.s3.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ContentType=content_type,
+            **extra
+        )
+        etag = res.get("ETag")
+
+        if self.enabled:
+            if etag:
+                self._store(key, bucket, etag, body)
+            else:
+                self.invalidate(key, bucket)
+        return etag
+
+    def invalidate(self, key, bucket=None):
+        bucket = bucket or self.bucket
+        name = self._name(key, bucket)
+        with self._lock:
+            meta = self._index.pop(name, None)
+            if meta is not None:
+                self._total -= meta["size"]
+        self._remove_files(name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+            }
+
+
+blob_cache = BlobCache(
+    get_s3_client(),
+    S3_BUCKET,
+    BLOB_CACHE_DIR,
+    BLOB_CACHE_MAX_BYTES,
+    enabled=BLOB_CACHE_ENABLED
+)
@@ -0,0 +1,97 @@
+"""
+폰트 갤러리 index (폰트별 평균 임베딩) 저장 / 로드.
+
+    {FONT_INDEX_DIR}/gallery_{checkpoint sha256 앞 16자}.npy   ← (F, D) float32, mmap 으로 로드
+    {FONT_INDEX_DIR}/gallery_{checkpoint sha256 앞 16자}.json  ← font_ids + checkpoint / dataset fingerprint
+
+체크포인트가 바뀌면 파일 이름 자체가 달라지고,
+데이터셋(갤러리에 쓰는 샘플 PNG 목록 / 크기 / 수정시각)이 바뀌면 json 의 dataset fingerprint 가 달라져서 stale.
+데이터셋 폴더가 없는 서버(index만 배포)에서는 dataset 비교 없이 index를 그대로 쓴다.
+torch 는 쓰지 않음 (numpy 배열로 주고받음).
+"""
+import os
+import json
+import time
+import hashlib
+from glob import glob
+
+import numpy as np
+
+FONT_INDEX_FORMAT = 1
+
+
+def dataset_samples(font_data_root, font_ids, per_font):
+    """{font_id: [png 경로 (정렬, 최대 per_font 장)]} - 폴더/PNG 없는 폰트는 빠짐"""
+    samples = {}
+    for font_id in sorted(font_ids):
+        paths = sorted(glob(os.path.join(font_data_root, font_id, "*.png")))[:per_font]
+        if paths:
+            samples[font_id] = paths
+    return samples
+
+
+def dataset_fingerprint(font_data_root, samples):
+    h = hashlib.sha256()
+    for font_id, paths in samples.items():
+        for p in paths:
+            st = os.stat(p)
+            h.update(f"{os.path.relpath(p, font_data_root)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+def _paths(index_dir, checkpoint_sha):
+    base = os.path.join(index_dir, f"gallery_{checkpoint_sha[:16]}")
+    return base + ".npy", base + ".json"
+
+
+def load_gallery_index(index_dir, checkpoint_sha, dataset_fp=None):
+    """
+    (font_ids, embs) 또는 None (없음 / stale)
+    embs 는 copy-on-write mmap (np.memmap) - 페이지 단위로 필요할 때 읽힘
+    dataset_fp=None 이면 데이터셋 비교 생략
+    """
+    npy_path, meta_path = _paths(index_dir, checkpoint_sha)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("format") != FONT_INDEX_FORMAT or meta.get("checkpoint_sha256") != checkpoint_sha:
+        return None
+    if dataset_fp is not None and meta.get("dataset_fingerprint") != dataset_fp:
+        return None
+
+    try:
+        embs = np.load(npy_path, mmap_mode="c")
+    except (OSError, ValueError):
+        return None
+    if embs.shape != (len(meta["font_ids"]), meta["emb_dim"]):
+        return None
+    return meta["font_ids"], embs
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def save_gallery_index(index_dir, checkpoint_sha, dataset_fp, font_ids, embs):
+    """embs: (F, D) float32 배열. npy 먼저, json(meta)은 마지막에 써서 meta가 있으면 npy도 완전함"""
+    os.makedirs(index_dir, exist_ok=True)
+    npy_path, meta_path = _paths(index_dir, checkpoint_sha)
+    embs = np.ascontiguousarray(embs, dtype=np.float32)
+
+    _write_atomic(npy_path, lambda f: np.save(f, embs))
+    meta = {
+        "format": FONT_INDEX_FORMAT,
+        "checkpoint_sha256": checkpoint_sha,
+        "dataset_fingerprint": dataset_fp,
+        "font_ids": list(font_ids),
+        "emb_dim": int(embs.shape[1]),
+        "created": int(time.time()),
+    }
+    _write_atomic(meta_path, lambda f: f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8")))
+    return npy_path
@@ -0,0 +1,79 @@
+"""
+디코딩된 페이지 이미지(PIL) 메모리 캐시.
+
+웹툰 원본 한 장(예: 2000×15000)을 PNG/JPEG 디코딩하는 비용이 커서,
+(key, ETag, mode) 단위로 디코딩 결과를 메모리에 들고 있는다.
+메모리 예산(IMAGE_CACHE_MAX_BYTES)을 넘으면 오래 안 쓴 것부터 버림 (LRU).
+
+주의: 반환되는 Image는 캐시와 공유되므로 직접 수정하지 말 것
+(crop / convert / copy 는 새 이미지를 만들어서 괜찮음).
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+from utils.blob_cache import blob_cache
+
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+
+
+def _image_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+class DecodedImageCache:
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()   # (key, etag, mode) -> Image
+        self._total = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key, mode="RGB", blob=None):
+        """
+        S3 key의 이미지를 mode로 디코딩해서 반환 (ETag가 같으면 재디코딩 없음).
+        이미 받아둔 (bytes, etag)가 있으면 blob으로 넘겨서 S3 재요청을 생략.
+        """
+        img_bytes, etag = blob if blob is not None else blob_cache.get(key)
+        cache_key = (key, etag, mode)
+
+        with self._lock:
+            img = self._items.get(cache_key)
+            if img is not None:
+                self._items.move_to_end(cache_key)
+                self._stats["hits"] += 1
+                return img
+            self._stats["misses"] += 1
+
+        img = Image.open(io.BytesIO(img_bytes)).convert(mode)
+        img.load()
+        self._put(cache_key, img)
+        return img
+
+    def _put(self, cache_key, img):
+        size = _image_nbytes(img)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # 같은 key의 이전 ETag 버전은 더 이상 쓸 일이 없으니 같이 버림
+            stale = [k for k in self._items if k[0] == cache_key[0] and k[2] == cache_key[2]]
+            for k in stale:
+                self._total -= _image_nbytes(self._items.pop(k))
+
+            self._items[cache_key] = img
+            self._total += size
+
+            while self._total > self.max_bytes and self._items:
+                _, old = self._items.popitem(last=False)
+                self._total -= _image_nbytes(old)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "entries": len(self._items), "bytes": self._total}
+
+
+image_cache = DecodedImageCache(IMAGE_CACHE_MAX_BYTES)
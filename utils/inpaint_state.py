@@ -0,0 +1,88 @@
+"""
+이미지별 마지막 인페인팅 상태 (증분 재인페인팅용).
+
+/api/ocr/select 로 마스크에 사각형 몇 개만 추가된 경우,
+이전 마스크와 비교해서 바뀐 부분 주변만 다시 인페인팅하려면
+"어떤 원본(ETag)에 어떤 마스크로 어떤 결과(ETag)를 만들었는지"를 알아야 한다.
+
+로컬 디스크(INPAINT_STATE_DIR)에 image key별로
+    {sha1}.json      : image_key, image_etag, output_key, output_etag, mask_hash
+    {sha1}.mask.png  : 그때 사용한 마스크 (1bit PNG)
+를 저장한다. 서버가 재시작돼도 유지되고, 없어지면 전체 인페인팅으로 돌아갈 뿐이다.
+"""
+import os
+import json
+import hashlib
+import threading
+
+import numpy as np
+from PIL import Image
+
+INPAINT_STATE_DIR = os.environ.get("INPAINT_STATE_DIR", "/tmp/chowol_inpaint_state")
+
+
+def _mask_hash(mask):
+    h = hashlib.sha1(np.packbits(mask).tobytes())
+    h.update(repr(mask.shape).encode())
+    return h.hexdigest()
+
+
+class InpaintStateStore:
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self._lock = threading.Lock()
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _paths(self, image_key):
+        name = hashlib.sha1(image_key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.state_dir, name)
+        return base + ".json", base + ".mask.png"
+
+    def load(self, image_key):
+        """저장된 상태 dict (mask: bool 배열 포함) 또는 None"""
+        meta_path, mask_path = self._paths(image_key)
+        with self._lock:
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                with Image.open(mask_path) as m:
+                    state["mask"] = np.asarray(m.convert("L")) > 0
+            except (OSError, ValueError) as e:
+                if not isinstance(e, FileNotFoundError):
+                    print("[inpaint_state] broken state, ignore:", e)
+                return None
+
+        if state.get("image_key") != image_key or state.get("mask_hash") != _mask_hash(state["mask"]):
+            return None
+        return state
+
+    def save(self, image_key, image_etag, mask, output_key, output_etag):
+        meta_path, mask_path = self._paths(image_key)
+        meta = {
+            "image_key": image_key,
+            "image_etag": image_etag,
+            "output_key": output_key,
+            "output_etag": output_etag,
+            "mask_hash": _mask_hash(mask),
+        }
+
+        with self._lock:
+            # json의 mask_hash로 두 파일이 같은 버전인지 load 때 확인
+            tmp = mask_path + ".tmp"
+            Image.fromarray(mask).convert("1").save(tmp, format="PNG")
+            os.replace(tmp, mask_path)
+
+            tmp = meta_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, meta_path)
+
+    def clear(self, image_key):
+        with self._lock:
+            for path in self._paths(image_key):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+inpaint_state = InpaintStateStore(INPAINT_STATE_DIR)
@@ -0,0 +1,143 @@
+"""
+마스크 영역 기반 타일 분할 (부분 인페인팅용).
+
+1) 마스크를 cell × cell 격자로 줄여서(셀 안에 마스크 픽셀이 하나라도 있으면 True)
+   격자 위에서 연결 영역(8-이웃)을 찾음 → 영역별 bounding box
+2) 주변 문맥용 pad 만큼 넓히고, 겹치는 박스는 합침
+3) 타일 크기를 multiple 배수로 맞춤 (같은 크기 타일끼리 LaMa에서 batch로 묶이도록)
+4) 붙여넣기: 이미지 경계가 아닌 타일 가장자리는 feather 폭만큼 alpha를 서서히 올려서 이음새 제거
+"""
+from collections import deque
+
+import numpy as np
+
+
+def _grid_regions(mask, cell):
+    """마스크(bool, H×W) → 격자 연결 영역의 픽셀 bbox 목록 [(x0, y0, x1, y1)] (x1, y1 exclusive)"""
+    h, w = mask.shape
+    gh, gw = (h + cell - 1) // cell, (w + cell - 1) // cell
+
+    padded = np.zeros((gh * cell, gw * cell), dtype=bool)
+    padded[:h, :w] = mask
+    grid = padded.reshape(gh, cell, gw, cell).any(axis=(1, 3))
+
+    seen = np.zeros_like(grid)
+    regions = []
+    for gy, gx in zip(*map(np.ndarray.tolist, np.nonzero(grid))):
+        if seen[gy, gx]:
+            continue
+        seen[gy, gx] = True
+        y0 = y1 = gy
+        x0 = x1 = gx
+        todo = deque([(gy, gx)])
+        while todo:
+            cy, cx = todo.popleft()
+            y0, y1 = min(y0, cy), max(y1, cy)
+            x0, x1 = min(x0, cx), max(x1, cx)
+            for ny in (cy - 1, cy, cy + 1):
+                for nx in (cx - 1, cx, cx + 1):
+                    if 0 <= ny < gh and 0 <= nx < gw and grid[ny, nx] and not seen[ny, nx]:
+                        seen[ny, nx] = True
+                        todo.append((ny, nx))
+
+        regions.append((
+            x0 * cell, y0 * cell,
+            min(w, (x1 + 1) * cell), min(h, (y1 + 1) * cell)
+        ))
+    return regions
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _merge_overlapping(rects):
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for r in rects:
+            for i, o in enumerate(out):
+                if _overlaps(r, o):
+                    out[i] = (min(r[0], o[0]), min(r[1], o[1]), max(r[2], o[2]), max(r[3], o[3]))
+                    merged = True
+                    break
+            else:
+                out.append(r)
+        rects = out
+    return rects
+
+
+def _round_span(lo, hi, multiple, limit):
+    """[lo, hi) 를 multiple 배수 길이로 넓힘 (가운데 기준, 이미지 범위 안으로 밀어넣음)"""
+    size = min(limit, -(-(hi - lo) // multiple) * multiple)
+    lo = max(0, min(lo - (size - (hi - lo)) // 2, limit - size))
+    return lo, lo + size
+
+
+def plan_tiles(mask, pad=64, cell=32, multiple=128):
+    """
+    mask: bool 배열 (H×W)
+    반환: 서로 겹치지 않는 타일 목록 [(x0, y0, x1, y1)]
+    """
+    h, w = mask.shape
+    rects = [
+        (max(0, x0 - pad), max(0, y0 - pad), min(w, x1 + pad), min(h, y1 + pad))
+        for x0, y0, x1, y1 in _grid_regions(mask, cell)
+    ]
+
+    # 크기를 맞추다 보면 새로 겹치는 타일이 생길 수 있어서 더 이상 안 합쳐질 때까지 반복
+    while True:
+        rects = _merge_overlapping(rects)
+        rounded = []
+        for x0, y0, x1, y1 in rects:
+            x0, x1 = _round_span(x0, x1, multiple, w)
+            y0, y1 = _round_span(y0, y1, multiple, h)
+            rounded.append((x0, y0, x1, y1))
+        merged = _merge_overlapping(rounded)
+        if len(merged) == len(rounded):
+            return merged
+        rects = merged
+
+
+def feather_alpha(tile, image_size, feather, tile_mask=None):
+    """
+    타일 붙여넣기용 alpha (h×w float32, 0~1).
+    이미지 경계에 닿은 변은 feather 없이 1, 안쪽 변은 feather 픽셀에 걸쳐 0→1.
+    tile_mask(bool)가 주어지면 마스크 픽셀은 항상 1 (인페인팅 결과를 그대로 사용).
+    """
+    x0, y0, x1, y1 = tile
+    img_w, img_h = image_size
+    th, tw = y1 - y0, x1 - x0
+
+    def ramp(n, at_start_edge, at_end_edge):
+        idx = np.arange(n, dtype=np.float32)
+        r = np.ones(n, dtype=np.float32)
+        if feather > 0:
+            if not at_start_edge:
+                r = np.minimum(r, (idx + 1) / feather)
+            if not at_end_edge:
+                r = np.minimum(r, (n - idx) / feather)
+        return np.clip(r, 0.0, 1.0)
+
+    ry = ramp(th, y0 == 0, y1 == img_h)
+    rx = ramp(tw, x0 == 0, x1 == img_w)
+    alpha = np.minimum(ry[:, None], rx[None, :])
+
+    if tile_mask is not None:
+        alpha[tile_mask] = 1.0
+    return alpha
+
+
+def affected_mask(new_mask, changed, cell=32):
+    """
+    증분 인페인팅 대상: 바뀐 픽셀(changed) + 그 픽셀과 (격자 기준으로) 이어진 새 마스크 영역.
+    바뀐 곳에 붙은 말풍선 마스크를 중간에서 자르지 않고 통째로 다시 인페인팅하기 위함.
+    """
+    union = new_mask | changed
+    out = np.zeros_like(union)
+    for x0, y0, x1, y1 in _grid_regions(union, cell):
+        if changed[y0:y1, x0:x1].any():
+            out[y0:y1, x0:x1] = union[y0:y1, x0:x1]
+    return out
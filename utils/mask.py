@@ -0,0 +1,198 @@
+"""
+OCR 단어 polygon → 인페인팅 마스크 (uint8, 0/255).
+
+ImageDraw.polygon 을 단어마다 호출하지 않고 모든 polygon을 한 번에 채운다.
+- OpenCV(cv2)가 있으면 cv2.fillPoly 한 번
+- 없으면 NumPy scanline: polygon마다 행(row)별 [x 시작, x 끝) 구간을 한꺼번에 계산해서
+  구간에 속한 픽셀 index를 바로 만들어 한 번에 대입 (Vision 단어 polygon은 볼록 사각형이라 행마다 구간 하나)
+
+그 뒤
+- MASK_MERGE_PX : closing (팽창 후 침식) → 가까운 단어/글자 사이 틈을 메워서 덩어리로
+- MASK_DILATE_PX : 팽창 → 글자 외곽선/안티에일리어싱까지 덮어서 LaMa 후광(halo) 줄이기
+팽창은 정사각형 커널, 축별 shift OR 를 2배씩 늘려가며 (log r 번) 계산.
+NumPy 경로는 마스크가 있는 행 구간(+여유)만 잘라서 처리 → 비용이 페이지 크기가 아니라 글자 면적에 비례.
+"""
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+MASK_DILATE_PX = int(os.environ.get("MASK_DILATE_PX", "4"))
+MASK_MERGE_PX = int(os.environ.get("MASK_MERGE_PX", "6"))
+MASK_PNG_COMPRESS_LEVEL = int(os.environ.get("MASK_PNG_COMPRESS_LEVEL", "1"))
+
+
+def polygons_from_annotations(annotations):
+    """Vision text_annotations[1:] (단어) → (N, 4, 2) float32 꼭짓점 배열"""
+    polys = [
+        [(v.x, v.y) for v in txt.bounding_poly.vertices]
+        for txt in annotations[1:]
+    ]
+    polys = [p for p in polys if len(p) == 4]
+    if not polys:
+        return np.zeros((0, 4, 2), dtype=np.float32)
+    return np.asarray(polys, dtype=np.float32)
+
+
+def _fill_numpy(mask, polys):
+    h, w = mask.shape
+    n, k = polys.shape[:2]
+
+    ys = polys[..., 1]
+    y_min, y_max = ys.min(axis=1), ys.max(axis=1)
+    row0 = np.clip(np.floor(y_min), 0, h).astype(np.int64)
+    row1 = np.clip(np.floor(y_max) + 1, 0, h).astype(np.int64)       # exclusive
+    counts = np.maximum(row1 - row0, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return
+
+    # (polygon, row) 쌍 전개
+    pid = np.repeat(np.arange(n), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    rows = np.repeat(row0, counts) + (np.arange(total) - starts)
+
+    # 행 가운데에서 교차점 계산 (첫/마지막 행은 polygon y 범위 안으로 당겨서 얇은 polygon도 빠지지 않게)
+    yc = np.clip(rows + 0.5, y_min[pid], y_max[pid])[:, None]
+
+    a = polys[pid]                          # (M, K, 2)
+    b = np.roll(polys, -1, axis=1)[pid]
+    ay, by = a[..., 1], b[..., 1]
+    ax, bx = a[..., 0], b[..., 0]
+    lo, hi = np.minimum(ay, by), np.maximum(ay, by)
+
+    dy = by - ay
+    flat = dy == 0
+    t = (yc - ay) / np.where(flat, 1, dy)
+    xs = ax + t * (bx - ax)
+    hit = (yc >= lo) & (yc <= hi) & ~flat
+
+    # 수평 변은 양 끝점을 구간에 포함
+    xs_lo = np.where(hit, xs, np.inf).min(axis=1)
+    xs_hi = np.where(hit, xs, -np.inf).max(axis=1)
+    on_flat = flat & (np.abs(yc - ay) < 0.5)
+    if on_flat.any():
+        xs_lo = np.minimum(xs_lo, np.where(on_flat, np.minimum(ax, bx), np.inf).min(axis=1))
+        xs_hi = np.maximum(xs_hi, np.where(on_flat, np.maximum(ax, bx), -np.inf).max(axis=1))
+
+    valid = np.isfinite(xs_lo) & np.isfinite(xs_hi)
+    x0 = np.clip(np.floor(xs_lo[valid]), 0, w).astype(np.int64)
+    x1 = np.clip(np.floor(xs_hi[valid]) + 1, 0, w).astype(np.int64)   # exclusive
+    rows = rows[valid]
+    keep = x1 > x0
+    rows, x0, x1 = rows[keep], x0[keep], x1[keep]
+
+    # 구간 [x0, x1) 의 픽셀 index 전개 → 한 번에 대입
+    lengths = x1 - x0
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    mask.reshape(-1)[np.repeat(rows * w + x0, lengths) + offsets] = 255
+
+
+def fill_polygons(shape, polys):
+    """(H, W) uint8 마스크에 polygon (N, K, 2) 전부를 255로 채움"""
+    mask = np.zeros(shape, dtype=np.uint8)
+    if len(polys) == 0:
+        return mask
+    if cv2 is not None:
+        cv2.fillPoly(mask, list(np.round(polys).astype(np.int32)), 255)
+    else:
+        _fill_numpy(mask, polys)
+    return mask
+
+
+def _dilate_axis(m, r, axis):
+    """bool 배열을 axis 방향으로 ±r 팽창 (shift 폭을 2배씩 늘려서 log r 번)"""
+    out = m.copy()
+    covered = 0
+    while covered < r:
+        step = min(covered + 1, r - covered)
+        shifted = np.zeros_like(out)
+        src = [slice(None)] * out.ndim
+        dst = [slice(None)] * out.ndim
+
+        src[axis], dst[axis] = slice(0, -step), slice(step, None)
+        shifted[tuple(dst)] = out[tuple(src)]
+        src[axis], dst[axis] = slice(step, None), slice(0, -step)
+        shifted[tuple(dst)] |= out[tuple(src)]
+
+        out |= shifted
+        covered += step
+    return out
+
+
+def _dilate(m, r):
+    return _dilate_axis(_dilate_axis(m, r, 0), r, 1)
+
+
+def _close(m, r):
+    """closing: 팽창 후 침식 → 2r 보다 좁은 틈을 메움 (이미지 경계에서는 깎이지 않음)"""
+    return ~_dilate(~_dilate(m, r), r)
+
+
+def _bands(rows_any, margin):
+    """마스크가 있는 행을 margin 만큼 넓혀서 이어지는 구간 [(top, bottom)]"""
+    grown = _dilate_axis(rows_any, margin, 0)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], grown.astype(np.int8), [0]))))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def morph_mask(mask, merge_px, dilate_px):
+    """closing(merge_px) 후 dilation(dilate_px). mask: uint8 0/255"""
+    if merge_px <= 0 and dilate_px <= 0:
+        return mask
+
+    if cv2 is not None:
+        if merge_px > 0:
+            kernel = np.ones((2 * merge_px + 1, 2 * merge_px + 1), np.uint8)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, borderType=cv2.BORDER_REPLICATE)
+        if dilate_px > 0:
+            mask = cv2.dilate(mask, np.ones((2 * dilate_px + 1, 2 * dilate_px + 1), np.uint8))
+        return mask
+
+    # 행 구간마다 따로 처리 (구간 사이는 2 * (merge + dilate) 이상 떨어져 있어서 서로 영향 없음)
+    m = mask > 0
+    out = np.zeros_like(m)
+    margin = 2 * max(merge_px, 0) + max(dilate_px, 0)
+    for top, bottom in _bands(m.any(axis=1), margin):
+        band = m[top:bottom]
+        cols = np.flatnonzero(_dilate_axis(band.any(axis=0), margin, 0))
+        left, right = cols[0], cols[-1] + 1
+        part = band[:, left:right]
+        if merge_px > 0:
+            part = _close(part, merge_px)
+        if dilate_px > 0:
+            part = _dilate(part, dilate_px)
+        out[top:bottom, left:right] = part
+    return out.astype(np.uint8) * 255
+
+
+def build_text_mask(size, annotations, dilate_px=None, merge_px=None):
+    """
+    size: (width, height), annotations: Vision text_annotations
+    반환: mode "L" PIL 마스크
+    """
+    width, height = size
+    dilate_px = MASK_DILATE_PX if dilate_px is None else dilate_px
+    merge_px = MASK_MERGE_PX if merge_px is None else merge_px
+
+    mask = fill_polygons((height, width), polygons_from_annotations(annotations))
+    return Image.fromarray(morph_mask(mask, merge_px, dilate_px))
+
+
+def encode_mask_png(mask_image):
+    """
+    마스크 PNG 인코딩: 1bit PNG + 낮은 압축 레벨.
+    0/255 뿐이라 8bit "L"로 저장할 때보다 압축할 데이터가 1/8 이고 파일도 더 작다.
+    (읽는 쪽은 모두 convert("L") 하므로 그대로 0/255 로 돌아옴)
+    """
+    bits = Image.fromarray(np.asarray(mask_image.convert("L")) > 0)
+    buffer = io.BytesIO()
+    bits.save(buffer, format="PNG", compress_level=MASK_PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
@@ -1,42 +1,236 @@
-from collections import Counter
+"""
+Vision full_text_annotation JSON 파서.
 
-def detect_language_from_ocr(full_json):
-    try:
-        langs = full_json["pages"][0]["property"]["detectedLanguages"]
-        if len(langs) > 0:
-            return langs[0]["languageCode"]
-    except:
-        pass
-
-    for page in full_json.get("pages", []):
-        for block in page.get("blocks", []):
-            for para in block.get("paragraphs", []):
-                for word in para.get("words", []):
-                    langs = word.get("property", {}).get("detectedLanguages", [])
-                    if langs:
-                        return langs[0]["languageCode"]
+번역(translate_service)과 박스 배치(reinsert_service)가 같이 쓰는 공용 파서.
+수 MB짜리 JSON을 dict로 다 올리지 않고 (ijson이 있으면) 스트리밍으로 읽으면서
+symbol 단위로 바로 줄(OcrLine)을 만든다.
 
-    return "auto"  
+- OcrLine: 줄 텍스트 + symbol별 4꼭짓점을 int32 배열 하나에 packed로 저장
+- OcrDocument.layout_lines: reinsert 기준 줄 (LINE_BREAK 마다 끊음, 꼭짓점 포함)
+- OcrDocument.text_lines: translate 기준 줄 (block 단위로 모은 뒤 LINE_BREAK로 나눔)
 
+기본(지원) 경로는 json.loads 후 dict 순회. ijson은 선택 의존성으로,
+설치돼 있으면 스트리밍 경로를 쓰고 결과는 두 경로가 같다 (requirements.txt 주석 참고).
+"""
+import io
+import json
+from array import array
 
-def extract_lines_from_ocr(full_json):
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# 좌표가 없는 꼭짓점 (Vision은 0인 좌표를 JSON에서 빼버림)
+MISSING = -2 ** 31
+
+_WORD = "pages.item.blocks.item.paragraphs.item.words.item"
+_SYMBOL = _WORD + ".symbols.item"
+_VERTEX = _SYMBOL + ".boundingBox.vertices.item"
+_WRAPPER = "fullTextAnnotation."
+
+
+class OcrLine:
+    __slots__ = ("text", "block", "vertices", "symbol_count")
+
+    def __init__(self, text, block, vertices, symbol_count):
+        self.text = text
+        self.block = block                  # 첫 symbol이 속한 block index
+        self.vertices = vertices            # array('i'): symbol마다 x0,y0,x1,y1,x2,y2,x3,y3
+        self.symbol_count = symbol_count
+
+    def xs(self):
+        return [x for x in self.vertices[0::2] if x != MISSING]
+
+    def ys(self):
+        return [y for y in self.vertices[1::2] if y != MISSING]
+
+    def clean_points(self, start=0, end=None):
+        """x, y가 둘 다 있는 꼭짓점 [(x, y), ...] (start~end는 꼭짓점 index)"""
+        v = self.vertices
+        end = len(v) // 2 if end is None else end
+        return [
+            (v[2 * i], v[2 * i + 1]) for i in range(start, end)
+            if v[2 * i] != MISSING and v[2 * i + 1] != MISSING
+        ]
+
+    def symbol_clean_points(self, i):
+        return self.clean_points(4 * i, 4 * i + 4)
+
+
+class OcrDocument:
+    __slots__ = ("language", "layout_lines", "text_lines", "manual_texts")
+
+    def __init__(self, language, layout_lines, text_lines, manual_texts):
+        self.language = language
+        self.layout_lines = layout_lines
+        self.text_lines = text_lines
+        self.manual_texts = manual_texts
+
+
+class _LineBuilder:
+    """symbol을 문서 순서대로 받아서 두 가지 줄 목록을 동시에 만든다."""
+
+    def __init__(self):
+        self.layout_lines = []
+        self.text_lines = []
+
+        self._text = ""
+        self._block = -1
+        self._verts = array("i")
+        self._count = 0
+
+        self._sentence = ""
+        self._sentence_block = None
+
+    def add_symbol(self, text, brk, block, verts):
+        # --- translate 기준: block이 바뀌면 그동안 모은 문장을 줄로 나눔 ---
+        if block != self._sentence_block:
+            self._flush_sentence()
+            self._sentence_block = block
+        self._sentence += text
+
+        # --- reinsert 기준: block과 상관없이 LINE_BREAK 에서만 끊음 ---
+        if not self._text:
+            self._block = block
+        self._text += text
+        for i in range(4):
+            x, y = verts[i] if i < len(verts) else (None, None)
+            self._verts.append(MISSING if x is None else x)
+            self._verts.append(MISSING if y is None else y)
+        self._count += 1
+
+        if brk == "LINE_BREAK":
+            self._sentence += "\n"
+            self._flush_layout()
+
+    def _flush_layout(self):
+        if self._text.strip():
+            self.layout_lines.append(
+                OcrLine(self._text.strip(), self._block, self._verts, self._count)
+            )
+        self._text, self._verts, self._count = "", array("i"), 0
+
+    def _flush_sentence(self):
+        for line in self._sentence.split("\n"):
+            if line.strip():
+                self.text_lines.append(line.strip())
+        self._sentence = ""
+
+    def finish(self):
+        self._flush_layout()
+        self._flush_sentence()
+
+
+def _parse_dict(full_json, builder):
     pages = full_json.get("pages") or full_json.get("fullTextAnnotation", {}).get("pages", [])
-    lines = []
 
-    for page in pages:
-        for block in page.get("blocks", []):
-            sentence = ""
+    page_lang, word_lang = None, None
+    block_idx = -1
 
+    for page_i, page in enumerate(pages):
+        if page_i == 0:
+            langs = page.get("property", {}).get("detectedLanguages", [])
+            if langs:
+                page_lang = langs[0].get("languageCode")
+
+        for block in page.get("blocks", []):
+            block_idx += 1
             for para in block.get("paragraphs", []):
                 for word in para.get("words", []):
+                    if word_lang is None:
+                        langs = word.get("property", {}).get("detectedLanguages", [])
+                        if langs:
+                            word_lang = langs[0].get("languageCode")
+
                     for sym in word.get("symbols", []):
-                        sentence += sym.get("text", "")
-                        br = sym.get("property", {}).get("detectedBreak", {})
-                        if br.get("type") == "LINE_BREAK":
-                            sentence += "\n"
+                        verts = [
+                            (v.get("x"), v.get("y"))
+                            for v in sym.get("boundingBox", {}).get("vertices", [])
+                        ]
+                        brk = sym.get("property", {}).get("detectedBreak", {}).get("type")
+                        builder.add_symbol(sym.get("text", ""), brk, block_idx, verts)
+
+    return page_lang or word_lang, full_json.get("manualTexts", [])
+
+
+def _parse_stream(fp, builder):
+    page_lang, word_lang = None, None
+    page_idx, block_idx = -1, -1
+    text, brk, verts = "", None, []
+    manual_texts, manual_builder = [], None
 
-            for line in sentence.split("\n"):
-                if line.strip():
-                    lines.append(line.strip())
+    for prefix, event, value in ijson.parse(fp):
+        if prefix.startswith(_WRAPPER):
+            prefix = prefix[len(_WRAPPER):]
 
-    return lines
+        # manualTexts 항목은 그대로 dict로 복원 (작음)
+        if prefix.startswith("manualTexts.item"):
+            if prefix == "manualTexts.item" and event == "start_map":
+                manual_builder = ijson.ObjectBuilder()
+            manual_builder.event(event, value)
+            if prefix == "manualTexts.item" and event == "end_map":
+                manual_texts.append(manual_builder.value)
+                manual_builder = None
+            continue
+
+        if prefix == _SYMBOL:
+            if event == "start_map":
+                text, brk, verts = "", None, []
+            elif event == "end_map":
+                builder.add_symbol(text, brk, block_idx, verts)
+        elif prefix == _SYMBOL + ".text":
+            text = value
+        elif prefix == _SYMBOL + ".property.detectedBreak.type":
+            brk = value
+        elif prefix == _VERTEX and event == "start_map":
+            verts.append([None, None])
+        elif prefix == _VERTEX + ".x":
+            verts[-1][0] = int(value)
+        elif prefix == _VERTEX + ".y":
+            verts[-1][1] = int(value)
+        elif prefix == "pages.item.blocks.item" and event == "start_map":
+            block_idx += 1
+        elif prefix == "pages.item" and event == "start_map":
+            page_idx += 1
+        elif prefix == "pages.item.property.detectedLanguages.item.languageCode":
+            if page_idx == 0 and page_lang is None:
+                page_lang = value
+        elif prefix == _WORD + ".property.detectedLanguages.item.languageCode":
+            if word_lang is None:
+                word_lang = value
+
+    return page_lang or word_lang, manual_texts
+
+
+def parse_ocr_json(source):
+    """
+    source: dict(이미 로드된 JSON) / bytes / file-like
+    → OcrDocument
+    """
+    builder = _LineBuilder()
+
+    if isinstance(source, dict):
+        language, manual_texts = _parse_dict(source, builder)
+    elif ijson is not None:
+        fp = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        language, manual_texts = _parse_stream(fp, builder)
+    else:
+        data = json.loads(source if isinstance(source, (bytes, bytearray, str)) else source.read())
+        language, manual_texts = _parse_dict(data, builder)
+
+    builder.finish()
+    return OcrDocument(
+        language or "auto",
+        builder.layout_lines,
+        builder.text_lines,
+        manual_texts
+    )
+
+
+def detect_language_from_ocr(full_json):
+    return parse_ocr_json(full_json).language
+
+
+def extract_lines_from_ocr(full_json):
+    return parse_ocr_json(full_json).text_lines
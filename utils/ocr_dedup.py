@@ -0,0 +1,142 @@
+"""
+OCR 결과 중복 제거 (같은 이미지 바이트면 Vision을 다시 부르지 않음).
+
+이미지 바이트의 SHA-256 → 처음 OCR 했을 때의 결과물 사본:
+
+    ocr_dedup/{sha256}/result.json   ← ocr_results/{filename}.json 사본 (manualTexts 붙기 전)
+    ocr_dedup/{sha256}/lines.bin     ← 줄 index 사본
+    ocr_dedup/{sha256}/mask.png      ← 마스크 사본 (select 사각형 붙기 전)
+    ocr_dedup/{sha256}/manifest.json ← 위 파일들이 다 복사된 뒤 마지막에 씀 (있으면 사본도 완전함)
+
+ocr_results / mask 쪽 파일은 이후 select 로 수정되므로 사본을 따로 두고,
+hit 이면 S3 CopyObject (서버 측 복사) 로 새 파일명 위치에 복사만 한다.
+manifest 의 config 가 지금 설정(타일 OCR / 마스크 팽창 등)과 다르면 miss 로 본다.
+"""
+import os
+import time
+import hashlib
+import threading
+
+from botocore.exceptions import ClientError
+
+from utils.s3 import upload_json_to_s3, load_json
+from utils.s3_client import get_s3_client, is_not_found, S3_BUCKET
+from utils.blob_cache import blob_cache
+
+OCR_DEDUP = os.environ.get("OCR_DEDUP", "1") != "0"
+OCR_DEDUP_PREFIX = os.environ.get("OCR_DEDUP_PREFIX", "ocr_dedup")
+
+# 결과물 종류 → 사본 파일 이름
+_ARTIFACTS = {
+    "json": "result.json",
+    "index": "lines.bin",
+    "mask": "mask.png",
+}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class OcrDedupIndex:
+
+    def __init__(self, s3, bucket, prefix, enabled=True):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "registered": 0, "errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _key(self, sha, name):
+        return f"{self.prefix}/{sha}/{name}"
+
+    def _copy(self, src, dst):
+        self.s3.copy_object(
+            Bucket=self.bucket,
+            Key=dst,
+            CopySource={"Bucket": self.bucket, "Key": src}
+        )
+        # 로컬 blob 캐시에 예전 내용이 남아 있지 않도록
+        blob_cache.invalidate(dst)
+
+    def lookup(self, sha, config):
+        """manifest dict 또는 None (hit / miss 카운트)"""
+        if not self.enabled:
+            return None
+        try:
+            manifest = load_json(self._key(sha, "manifest.json"))
+        except ClientError as e:
+            if not is_not_found(e):
+                print("[ocr_dedup] lookup failed:", e)
+                self._count("errors")
+            self._count("misses")
+            return None
+        except ValueError as e:
+            # 잘리거나 깨진 manifest
+            print("[ocr_dedup] invalid manifest:", e)
+            self._count("errors")
+            self._count("misses")
+            return None
+
+        if not isinstance(manifest, dict):
+            print("[ocr_dedup] invalid manifest: not an object")
+            self._count("errors")
+            self._count("misses")
+            return None
+        if manifest.get("config") != config:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return manifest
+
+    def register(self, sha, config, filename, keys):
+        """
+        keys: {"json": ..., "index": ..., "mask": ...} 방금 만든 결과물의 S3 key
+        사본을 다 복사한 뒤 manifest 를 씀.
+        """
+        if not self.enabled:
+            return
+        try:
+            for kind, name in _ARTIFACTS.items():
+                self._copy(keys[kind], self._key(sha, name))
+
+            upload_json_to_s3({
+                "sha256": sha,
+                "config": config,
+                "source": filename,
+                "created": int(time.time()),
+            }, self._key(sha, "manifest.json"))
+            self._count("registered")
+        except Exception as e:
+            print("[ocr_dedup] register failed:", e)
+            self._count("errors")
+
+    def restore(self, sha, keys):
+        """
+        사본을 keys 위치로 서버 측 복사 (keys: {"json", "index", "mask"}).
+        실패하면 False (사본 일부 누락 등) - 호출하는 쪽은 Vision 경로로 다시 만들어서 keys를 덮어씀
+        """
+        try:
+            for kind, name in _ARTIFACTS.items():
+                self._copy(self._key(sha, name), keys[kind])
+        except Exception as e:
+            print("[ocr_dedup] restore failed:", e)
+            self._count("errors")
+            return False
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+
+ocr_dedup = OcrDedupIndex(get_s3_client(), S3_BUCKET, OCR_DEDUP_PREFIX, OCR_DEDUP)
@@ -0,0 +1,195 @@
+"""
+OCR 줄 geometry 계산 (박스 / 각도 / 방향 / 평균 글자 높이).
+
+- compute_raw_angle / decide_orientation / compute_symbol_height:
+  reinsert_service에서 쓰던 줄 단위 계산 (기준 구현)
+- compute_line_geometry: 페이지 전체 symbol 꼭짓점을 (N, 4, 2) 배열 하나로 모아서
+  위 계산을 NumPy로 한 번에 처리 (결과는 기준 구현과 동일)
+"""
+import math
+
+import numpy as np
+
+from utils.ocr import MISSING
+
+ORIENTATIONS = ("horizontal", "vertical", "diagonal")
+
+_BIG = np.iinfo(np.int64).max
+_SMALL = np.iinfo(np.int64).min
+
+
+# ---------- 줄 단위 (기준 구현) ----------
+
+def compute_raw_angle(points):
+    # points: x, y가 둘 다 있는 꼭짓점 [(x, y), ...]
+    if len(points) < 4:
+        return 0
+    pts = points[:4]
+    edges = [(pts[0], pts[1]), (pts[1], pts[2]), (pts[2], pts[3]), (pts[3], pts[0])]
+    max_len, longest = -1, None
+
+    for p1, p2 in edges:
+        dx = p2[0] - p1[0]
+        dy = p2[1] - p1[1]
+        length = dx * dx + dy * dy
+        if length > max_len:
+            max_len = length
+            longest = (p1, p2)
+
+    (x1, y1), (x2, y2) = longest
+    return math.degrees(math.atan2(y2 - y1, x2 - x1))
+
+
+def decide_orientation(line):
+    xs = line.xs()
+    ys = line.ys()
+
+    w = max(xs) - min(xs)
+    h = max(ys) - min(ys)
+    raw = compute_raw_angle(line.clean_points())
+
+    if w > h * 1.3:
+        return 0, "horizontal"
+    if h > w * 1.3:
+        return -90, "vertical"
+
+    ang = raw
+    if ang < -90:
+        ang += 180
+    if ang > 90:
+        ang -= 180
+    return ang, "diagonal"
+
+
+def compute_symbol_height(line):
+    heights = []
+    for i in range(line.symbol_count):
+        clean = line.symbol_clean_points(i)
+        if len(clean) < 2:
+            continue
+        ys = [y for _, y in clean]
+        heights.append(max(ys) - min(ys))
+    return int((sum(heights) / len(heights)) * 0.9) if heights else 20
+
+
+def compute_line_geometry_scalar(lines):
+    """기준 구현으로 줄마다 계산 (compute_line_geometry와 같은 형태로 반환)"""
+    out = {k: [] for k in ("x", "y", "width", "height", "symbol_height", "angle", "orientation")}
+
+    for line in lines:
+        xs, ys = line.xs(), line.ys()
+        if xs and ys:
+            angle, orientation = decide_orientation(line)
+            x, y = min(xs), min(ys)
+            w, h = max(xs) - x, max(ys) - y
+        else:
+            angle, orientation = 0, "horizontal"
+            x = y = w = h = 0
+
+        out["x"].append(x)
+        out["y"].append(y)
+        out["width"].append(w)
+        out["height"].append(h)
+        out["symbol_height"].append(compute_symbol_height(line))
+        out["angle"].append(float(angle))
+        out["orientation"].append(ORIENTATIONS.index(orientation))
+
+    return {
+        k: np.asarray(v, dtype=np.float64 if k == "angle" else np.int64)
+        for k, v in out.items()
+    }
+
+
+# ---------- 페이지 단위 (NumPy) ----------
+
+def pack_lines(lines):
+    """
+    OcrLine 목록 → (N, 4, 2) int64 꼭짓점 배열 + 줄별 symbol 시작 offset (L,)
+    """
+    counts = np.fromiter((line.symbol_count for line in lines), dtype=np.int64, count=len(lines))
+    raw = b"".join(line.vertices.tobytes() for line in lines)
+    verts = np.frombuffer(raw, dtype=np.int32).astype(np.int64).reshape(-1, 4, 2)
+
+    offsets = np.zeros(len(lines), dtype=np.int64)
+    np.cumsum(counts[:-1], out=offsets[1:])
+    return verts, offsets, counts
+
+
+def compute_line_geometry(lines):
+    """
+    페이지의 모든 줄 geometry를 한 번에 계산.
+    반환: {"x", "y", "width", "height", "symbol_height", "angle", "orientation"} (길이 L 배열)
+    orientation은 ORIENTATIONS index.
+    """
+    n_lines = len(lines)
+    if n_lines == 0:
+        return compute_line_geometry_scalar([])
+
+    verts, sym_offsets, sym_counts = pack_lines(lines)
+    x = verts[..., 0]                               # (N, 4)
+    y = verts[..., 1]
+    has_x = x != MISSING
+    has_y = y != MISSING
+    clean = has_x & has_y
+
+    # --- 줄별 bounding box (좌표가 있는 것만) ---
+    xmin = np.minimum.reduceat(np.where(has_x, x, _BIG).min(axis=1), sym_offsets)
+    xmax = np.maximum.reduceat(np.where(has_x, x, _SMALL).max(axis=1), sym_offsets)
+    ymin = np.minimum.reduceat(np.where(has_y, y, _BIG).min(axis=1), sym_offsets)
+    ymax = np.maximum.reduceat(np.where(has_y, y, _SMALL).max(axis=1), sym_offsets)
+    ok = (
+        (np.add.reduceat(has_x.sum(axis=1), sym_offsets) > 0)
+        & (np.add.reduceat(has_y.sum(axis=1), sym_offsets) > 0)
+    )
+
+    w = np.where(ok, xmax - xmin, 0)
+    h = np.where(ok, ymax - ymin, 0)
+
+    # --- 가장 긴 변의 각도: 줄에서 x, y 둘 다 있는 앞쪽 4개 꼭짓점 기준 ---
+    pts = verts.reshape(-1, 2)                      # (4N, 2)
+    clean_flat = clean.reshape(-1)
+    pt_offsets = sym_offsets * 4
+    line_of_pt = np.repeat(np.arange(n_lines), sym_counts * 4)
+
+    csum = np.cumsum(clean_flat)
+    before = np.concatenate(([0], csum))[pt_offsets]      # 줄 시작 전까지 clean 개수
+    rank = csum - before[line_of_pt] - 1                  # 줄 안에서 몇 번째 clean 꼭짓점인지
+    n_clean = np.add.reduceat(clean_flat.astype(np.int64), pt_offsets)
+    has_quad = n_clean >= 4
+
+    sel = clean_flat & (rank < 4) & has_quad[line_of_pt]
+    quads = pts[sel].reshape(-1, 4, 2)                    # has_quad 줄 순서대로
+    d = np.roll(quads, -1, axis=1) - quads
+    longest = np.argmax((d * d).sum(axis=2), axis=1)      # 동률이면 앞쪽 변 (기준 구현과 동일)
+    edge = d[np.arange(len(quads)), longest]
+
+    # atan2는 줄 수(L)만큼만 → math로 계산해서 기준 구현과 비트 단위까지 같게
+    raw = np.zeros(n_lines, dtype=np.float64)
+    raw[has_quad] = [math.degrees(math.atan2(dy, dx)) for dx, dy in edge.tolist()]
+    raw = np.where(raw < -90, raw + 180, raw)
+    raw = np.where(raw > 90, raw - 180, raw)
+
+    horizontal = w > h * 1.3
+    vertical = ~horizontal & (h > w * 1.3)
+    orientation = np.where(horizontal, 0, np.where(vertical, 1, 2))
+    orientation = np.where(ok, orientation, 0)
+    angle = np.where(orientation == 0, 0.0, np.where(orientation == 1, -90.0, raw))
+
+    # --- 평균 글자 높이: x, y 둘 다 있는 꼭짓점이 2개 이상인 symbol만 ---
+    sym_ok = clean.sum(axis=1) >= 2
+    sym_h = np.where(clean, y, _SMALL).max(axis=1) - np.where(clean, y, _BIG).min(axis=1)
+    sym_h = np.where(sym_ok, sym_h, 0)
+    h_sum = np.add.reduceat(sym_h, sym_offsets)
+    h_cnt = np.add.reduceat(sym_ok.astype(np.int64), sym_offsets)
+    mean = h_sum / np.maximum(h_cnt, 1)
+    symbol_height = np.where(h_cnt > 0, np.trunc(mean * 0.9), 20).astype(np.int64)
+
+    return {
+        "x": np.where(ok, xmin, 0),
+        "y": np.where(ok, ymin, 0),
+        "width": w,
+        "height": h,
+        "symbol_height": symbol_height,
+        "angle": angle,
+        "orientation": orientation.astype(np.int64),
+    }
@@ -0,0 +1,184 @@
+"""
+OCR 줄 index (ocr_results/{filename}.json 옆에 저장하는 작은 sidecar).
+
+/api/translate, /api/reinsert 가 매번 Vision 원본 JSON을 다시 파싱하지 않도록
+process_ocr / process_ocr_select 시점에 줄 단위 결과를 미리 계산해서 저장한다.
+
+    ocr_results/{filename}.json        ← Vision 원본 (기존 그대로)
+    ocr_results/{filename}.lines.bin   ← 이 모듈의 line index
+
+포맷 (zlib 압축):
+    MAGIC(4) VERSION(uint16) HEADER_LEN(uint32) HEADER(JSON) + 컬럼 배열들
+    HEADER: language, text_lines, layout_texts, manual_texts, count
+    컬럼 (count개, little-endian): block/x/y/width/height/symbol_height (int32),
+                                    angle (float64), orientation (uint8)
+
+예전 프로젝트처럼 sidecar가 없으면 원본 JSON에서 다시 만들어서 저장한다.
+"""
+import sys
+import json
+import zlib
+import struct
+from array import array
+
+import numpy as np
+from botocore.exceptions import ClientError
+from utils.ocr import parse_ocr_json
+from utils.ocr_geometry import ORIENTATIONS, compute_line_geometry
+from utils.blob_cache import blob_cache
+from utils.s3 import get_json_bytes
+from utils.s3_client import extract_s3_key, is_not_found
+
+MAGIC = b"OCLX"
+VERSION = 1
+
+_INT_COLUMNS = ("block", "x", "y", "width", "height", "symbol_height")
+
+
+# ---------- index ----------
+
+class LineIndex:
+    __slots__ = (
+        "language", "text_lines", "layout_texts", "manual_texts",
+        "block", "x", "y", "width", "height", "symbol_height", "angle", "orientation",
+    )
+
+    def __init__(self, language, text_lines, layout_texts, manual_texts):
+        self.language = language
+        self.text_lines = text_lines        # translate 기준 줄
+        self.layout_texts = layout_texts    # reinsert 기준 줄 (아래 컬럼과 같은 순서)
+        self.manual_texts = manual_texts
+
+        for name in _INT_COLUMNS:
+            setattr(self, name, array("i"))
+        self.angle = array("d")
+        self.orientation = bytearray()
+
+    def __len__(self):
+        return len(self.layout_texts)
+
+    def line_geometry(self, i):
+        """(x, y, width, height, angle, orientation, symbol_height)"""
+        orientation = ORIENTATIONS[self.orientation[i]]
+        if orientation == "horizontal":
+            angle = 0
+        elif orientation == "vertical":
+            angle = -90
+        else:
+            angle = self.angle[i]
+        return (
+            self.x[i], self.y[i], self.width[i], self.height[i],
+            angle, orientation, self.symbol_height[i]
+        )
+
+    def to_bytes(self):
+        header = json.dumps({
+            "language": self.language,
+            "text_lines": self.text_lines,
+            "layout_texts": self.layout_texts,
+            "manual_texts": self.manual_texts,
+            "count": len(self),
+        }, ensure_ascii=False).encode("utf-8")
+
+        columns = [getattr(self, name) for name in _INT_COLUMNS] + [self.angle]
+        if sys.byteorder != "little":
+            columns = [array(c.typecode, c) for c in columns]
+            for c in columns:
+                c.byteswap()
+
+        payload = b"".join(
+            [struct.pack("<I", len(header)), header]
+            + [c.tobytes() for c in columns]
+            + [bytes(self.orientation)]
+        )
+        return MAGIC + struct.pack("<H", VERSION) + zlib.compress(payload, 6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != MAGIC:
+            raise ValueError("not an OCR line index")
+        (version,) = struct.unpack_from("<H", data, 4)
+        if version != VERSION:
+            raise ValueError(f"unsupported OCR line index version: {version}")
+
+        payload = zlib.decompress(data[6:])
+        (header_len,) = struct.unpack_from("<I", payload, 0)
+        offset = 4 + header_len
+        header = json.loads(payload[4:offset].decode("utf-8"))
+
+        idx = cls(
+            header["language"],
+            header["text_lines"],
+            header["layout_texts"],
+            header["manual_texts"]
+        )
+        n = header["count"]
+
+        for name, typecode in [(c, "i") for c in _INT_COLUMNS] + [("angle", "d")]:
+            col = array(typecode)
+            size = col.itemsize * n
+            col.frombytes(payload[offset:offset + size])
+            if sys.byteorder != "little":
+                col.byteswap()
+            setattr(idx, name, col)
+            offset += size
+
+        idx.orientation = bytearray(payload[offset:offset + n])
+        return idx
+
+
+def build_line_index(doc):
+    """OcrDocument → LineIndex (페이지 전체 줄의 박스 / 각도 / 방향 / 글자 높이를 한 번에 계산)"""
+    idx = LineIndex(
+        doc.language,
+        list(doc.text_lines),
+        [line.text for line in doc.layout_lines],
+        list(doc.manual_texts)
+    )
+
+    geometry = compute_line_geometry(doc.layout_lines)
+
+    idx.block = array("i", [line.block for line in doc.layout_lines])
+    for name in ("x", "y", "width", "height", "symbol_height"):
+        col = array("i")
+        col.frombytes(geometry[name].astype(np.int32).tobytes())
+        setattr(idx, name, col)
+
+    idx.angle = array("d")
+    idx.angle.frombytes(geometry["angle"].astype(np.float64).tobytes())
+    idx.orientation = bytearray(geometry["orientation"].astype(np.uint8).tobytes())
+
+    return idx
+
+
+def index_key_for(json_key):
+    """ocr_results/{filename}.json → ocr_results/{filename}.lines.bin"""
+    base = json_key[:-5] if json_key.endswith(".json") else json_key
+    return f"{base}.lines.bin"
+
+
+def save_line_index(idx, json_key):
+    blob_cache.put(index_key_for(json_key), idx.to_bytes(), "application/octet-stream")
+
+
+def load_line_index_by_key(json_key):
+    """sidecar를 읽고, 없거나 버전이 다르면 원본 JSON으로 다시 만들어서 저장."""
+    try:
+        return LineIndex.from_bytes(blob_cache.get_bytes(index_key_for(json_key)))
+    except ClientError as e:
+        if not is_not_found(e):
+            raise
+    except (ValueError, zlib.error) as e:
+        print("[ocr_index] rebuilding invalid line index:", e)
+
+    doc = parse_ocr_json(get_json_bytes(json_key))
+    idx = build_line_index(doc)
+    try:
+        save_line_index(idx, json_key)
+    except Exception as e:
+        print("[ocr_index] failed to save line index:", e)
+    return idx
+
+
+def load_line_index(ocr_json_url):
+    return load_line_index_by_key(extract_s3_key(ocr_json_url))
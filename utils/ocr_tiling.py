@@ -0,0 +1,141 @@
+"""
+세로로 긴 웹툰 페이지용 타일 OCR.
+
+Vision은 너무 큰 이미지를 줄여서(또는 거부하고) 인식하기 때문에
+긴 페이지는 겹치는 가로 띠(tile)로 잘라서 따로 OCR 한 뒤 합친다.
+
+- plan_ocr_tiles : 겹침(overlap)이 있는 (top, bottom) 목록
+- merge_tile_responses : 타일별 AnnotateImageResponse → 페이지 좌표로 옮겨서 하나로 합침
+  겹침 구간에서 두 번 잡힌 단어는 "겹침 구간 가운데"를 경계로 소유 타일을 정해서 한 번만 남김
+  (단어 중심 y가 타일의 소유 구간 안에 있을 때만 채택)
+  결과는 기존 Vision 응답과 같은 모양 (full_text_annotation.pages[0].blocks..., text_annotations[1:] = 단어)
+"""
+from google.cloud import vision
+
+_BreakType = vision.TextAnnotation.DetectedBreak.BreakType
+_BREAK_TEXT = {
+    _BreakType.SPACE: " ",
+    _BreakType.SURE_SPACE: " ",
+    _BreakType.EOL_SURE_SPACE: "\n",
+    _BreakType.HYPHEN: "-\n",
+    _BreakType.LINE_BREAK: "\n",
+}
+
+
+def plan_ocr_tiles(height, tile_height, overlap):
+    """[(top, bottom)] : tile_height 높이, 이웃 타일과 overlap 만큼 겹침. 마지막 타일은 페이지 끝에 맞춤"""
+    if height <= tile_height:
+        return [(0, height)]
+
+    step = tile_height - overlap
+    tiles = []
+    top = 0
+    while top + tile_height < height:
+        tiles.append((top, top + tile_height))
+        top += step
+    tiles.append((max(0, height - tile_height), height))
+    return tiles
+
+
+def _ownership(tiles):
+    """타일별 소유 구간 [own_top, own_bottom) : 이웃 타일과 겹친 구간의 가운데에서 나눔"""
+    bounds = [0]
+    for (_, prev_bottom), (top, _) in zip(tiles, tiles[1:]):
+        bounds.append((top + prev_bottom) // 2)
+    bounds.append(tiles[-1][1])
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _center_y(poly):
+    ys = [v.y for v in poly.vertices]
+    return sum(ys) / len(ys) if ys else 0
+
+
+def _shift(poly, dy):
+    for v in poly.vertices:
+        v.y += dy
+
+
+def _set_rect(poly, polys):
+    """polys 꼭짓점 전체를 감싸는 축 정렬 사각형으로 poly를 덮어씀"""
+    xs = [v.x for p in polys for v in p.vertices]
+    ys = [v.y for p in polys for v in p.vertices]
+    del poly.vertices[:]
+    if not xs:
+        return
+    x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+    for x, y in ((x0, y0), (x1, y0), (x1, y1), (x0, y1)):
+        v = poly.vertices.add()
+        v.x, v.y = x, y
+
+
+def merge_tile_responses(tiles, responses, width, height):
+    """
+    tiles: plan_ocr_tiles 결과, responses: 타일 순서대로의 AnnotateImageResponse
+    반환: 페이지 전체에 대한 AnnotateImageResponse (페이지 좌표)
+    """
+    merged = vision.AnnotateImageResponse()._pb
+    page = merged.full_text_annotation.pages.add()
+    page.width, page.height = width, height
+
+    full_text = []
+    words_out = []
+    locale = ""
+
+    for (top, _), (own_top, own_bottom), res in zip(tiles, _ownership(tiles), responses):
+        pb = res._pb
+        if pb.text_annotations and not locale:
+            locale = pb.text_annotations[0].locale
+        if not pb.full_text_annotation.pages:
+            continue
+
+        src_page = pb.full_text_annotation.pages[0]
+        if not page.HasField("property") and src_page.HasField("property"):
+            page.property.CopyFrom(src_page.property)
+
+        for block in src_page.blocks:
+            new_block = None
+            for para in block.paragraphs:
+                new_para = None
+                for word in para.words:
+                    if not (own_top <= _center_y(word.bounding_box) + top < own_bottom):
+                        continue
+
+                    if new_block is None:
+                        new_block = page.blocks.add()
+                        new_block.property.CopyFrom(block.property)
+                        new_block.block_type = block.block_type
+                        new_block.confidence = block.confidence
+                    if new_para is None:
+                        new_para = new_block.paragraphs.add()
+                        new_para.property.CopyFrom(para.property)
+                        new_para.confidence = para.confidence
+
+                    w = new_para.words.add()
+                    w.CopyFrom(word)
+                    _shift(w.bounding_box, top)
+                    for sym in w.symbols:
+                        _shift(sym.bounding_box, top)
+                        full_text.append(sym.text + _BREAK_TEXT.get(sym.property.detected_break.type_, ""))
+                    words_out.append(w)
+
+                if new_para is not None:
+                    _set_rect(new_para.bounding_box, [w.bounding_box for w in new_para.words])
+            if new_block is not None:
+                _set_rect(new_block.bounding_box, [p.bounding_box for p in new_block.paragraphs])
+
+    text = "".join(full_text)
+    merged.full_text_annotation.text = text
+
+    # text_annotations: [전체 텍스트] + 단어별 polygon (마스크 생성에 사용)
+    if words_out:
+        entity = merged.text_annotations.add()
+        entity.description = text
+        entity.locale = locale
+        _set_rect(entity.bounding_poly, [w.bounding_box for w in words_out])
+        for w in words_out:
+            entity = merged.text_annotations.add()
+            entity.description = "".join(sym.text for sym in w.symbols)
+            entity.bounding_poly.CopyFrom(w.bounding_box)
+
+    return vision.AnnotateImageResponse.wrap(merged)
@@ -1,12 +1,82 @@
 import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from utils.translation_cache import translation_cache
 
 PAPAGO_CLIENT_ID = os.environ.get("PAPAGO_CLIENT_ID")
 PAPAGO_CLIENT_SECRET = os.environ.get("PAPAGO_CLIENT_SECRET")
 
-def papago_translate(text, source, target):
-    url = "https://papago.apigw.ntruss.com/nmt/v1/translation"
+PAPAGO_URL = "https://papago.apigw.ntruss.com/nmt/v1/translation"
+
+# Papago NMT 요청당 최대 글자 수
+PAPAGO_MAX_CHARS = int(os.environ.get("PAPAGO_MAX_CHARS", "5000"))
+
+# 동시 요청 / 호출 제한 (Papago QPS 쿼터에 맞춰 설정)
+PAPAGO_QPS = float(os.environ.get("PAPAGO_QPS", "10"))
+PAPAGO_MAX_WORKERS = int(os.environ.get("PAPAGO_MAX_WORKERS", "4"))
+PAPAGO_MAX_RETRIES = int(os.environ.get("PAPAGO_MAX_RETRIES", "4"))
+PAPAGO_TIMEOUT = float(os.environ.get("PAPAGO_TIMEOUT", "10"))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 여러 줄을 한 요청으로 묶을 때 쓰는 구분자 (Papago는 줄바꿈을 그대로 보존함)
+BATCH_DELIMITER = "\n"
+# 묶음 번역 줄 정렬 확인: 줄별 (번역 길이 / 원문 길이)가 chunk 전체 비율의 1/N ~ N 배 안이어야 함
+PAPAGO_ALIGN_MAX_RATIO = float(os.environ.get("PAPAGO_ALIGN_MAX_RATIO", "3"))
+
+
+class PapagoError(Exception):
+    pass
+
+
+class TokenBucket:
+    """초당 rate개씩 토큰이 차는 버킷. acquire()는 토큰이 생길 때까지 대기."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiter = TokenBucket(PAPAGO_QPS)
+_executor = ThreadPoolExecutor(max_workers=PAPAGO_MAX_WORKERS, thread_name_prefix="papago")
+_local = threading.local()
+
 
+def _session():
+    # 스레드별 Session (keep-alive 재사용)
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _backoff(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # exponential backoff + full jitter
+    return random.uniform(0, min(8.0, 0.5 * (2 ** attempt)))
+
+
+def _request_translation(text, source, target):
     headers = {
         "X-NCP-APIGW-API-KEY-ID": PAPAGO_CLIENT_ID,
         "X-NCP-APIGW-API-KEY": PAPAGO_CLIENT_SECRET,
@@ -18,10 +88,179 @@ def papago_translate(text, source, target):
         "text": text,
     }
 
-    res = requests.post(url, headers=headers, data=data)
+    for attempt in range(PAPAGO_MAX_RETRIES + 1):
+        _rate_limiter.acquire()
+        last_try = attempt == PAPAGO_MAX_RETRIES
+
+        try:
+            res = _session().post(PAPAGO_URL, headers=headers, data=data, timeout=PAPAGO_TIMEOUT)
+        except requests.RequestException as e:
+            if last_try:
+                raise PapagoError(str(e))
+            time.sleep(_backoff(attempt))
+            continue
+
+        if res.status_code == 200:
+            return res.json()["message"]["result"]["translatedText"]
+
+        # 429 / 5xx는 재시도, 나머지는 바로 실패
+        if res.status_code not in RETRY_STATUS or last_try:
+            raise PapagoError(f"{res.status_code} {res.text}")
+
+        time.sleep(_backoff(attempt, res.headers.get("Retry-After")))
+
+
+def _cache_get(text, source, target):
+    if translation_cache is None:
+        return None
+    try:
+        return translation_cache.get(text, source, target)
+    except Exception as e:
+        print("[papago] translation cache read error:", e)
+        return None
+
+
+def _cache_set(text, source, target, translated):
+    if translation_cache is None:
+        return
+    try:
+        translation_cache.set(text, source, target, translated)
+    except Exception as e:
+        print("[papago] translation cache write error:", e)
 
-    if res.status_code != 200:
-        print("Papago error:", res.text)
+
+def translation_cache_stats():
+    if translation_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **translation_cache.stats()}
+
+
+def _translate_uncached(text, source, target):
+    translated = _request_translation(text, source, target)
+    _cache_set(text, source, target, translated)
+    return translated
+
+
+def papago_translate(text, source, target):
+    cached = _cache_get(text, source, target)
+    if cached is not None:
+        return cached
+
+    try:
+        return _translate_uncached(text, source, target)
+    except PapagoError as e:
+        print("Papago error:", e)
         return "[번역 실패]"
 
-    return res.json()["message"]["result"]["translatedText"]
+
+def _pack_chunks(texts, indices, max_chars):
+    """
+    indices에 해당하는 texts를 구분자로 이어붙였을 때
+    max_chars를 넘지 않도록 index 묶음 리스트로 나눈다.
+    """
+    chunks, cur, cur_len = [], [], 0
+
+    for i in indices:
+        add = len(texts[i]) + (len(BATCH_DELIMITER) if cur else 0)
+        if cur and cur_len + add > max_chars:
+            chunks.append(cur)
+            cur, cur_len = [], 0
+            add = len(texts[i])
+        cur.append(i)
+        cur_len += add
+
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def _translate_single(text, source, target):
+    # 캐시 조회는 papago_translate_batch에서 이미 끝난 상태
+    try:
+        return _translate_uncached(text, source, target)
+    except Exception as e:
+        print(f"번역 실패: {e}")
+        return text
+
+
+def _looks_aligned(sources, parts):
+    """
+    줄 수가 같아도 Papago가 한 줄을 합치고 다른 줄을 나누면 어긋날 수 있음.
+    줄마다 길이 비율이 chunk 전체 비율에서 크게 벗어나거나 빈 줄이 생기면 어긋난 것으로 봄.
+    (짧은 줄의 흔들림을 줄이려고 길이에 +2)
+    """
+    if any(src.strip() and not part for src, part in zip(sources, parts)):
+        return False
+    overall = (sum(len(p) for p in parts) + 2 * len(parts)) / (sum(len(t) for t in sources) + 2 * len(sources))
+    for src, part in zip(sources, parts):
+        ratio = (len(part) + 2) / (len(src) + 2)
+        if not overall / PAPAGO_ALIGN_MAX_RATIO <= ratio <= overall * PAPAGO_ALIGN_MAX_RATIO:
+            return False
+    return True
+
+
+def _translate_chunk(texts, chunk, source, target):
+    """
+    chunk(= texts의 index 목록)를 한 번의 Papago 요청으로 번역.
+    응답을 구분자로 나눈 줄 수가 맞지 않거나 줄 정렬이 의심스러우면
+    해당 chunk는 번역 메모리에 넣지 않고 줄 단위 호출로 fallback.
+    """
+    if len(chunk) > 1:
+        joined = BATCH_DELIMITER.join(texts[i] for i in chunk)
+        try:
+            parts = _request_translation(joined, source, target).split(BATCH_DELIMITER)
+        except Exception as e:
+            print("Papago batch error:", e)
+            parts = None
+
+        if parts is not None and len(parts) == len(chunk):
+            parts = [p.strip() for p in parts]
+            if _looks_aligned([texts[i] for i in chunk], parts):
+                for i, p in zip(chunk, parts):
+                    _cache_set(texts[i], source, target, p)
+                return parts
+            print(f"Papago batch misaligned ({len(chunk)} lines), retrying line by line")
+
+    return [_translate_single(texts[i], source, target) for i in chunk]
+
+
+def papago_translate_batch(texts, source, target, max_chars=None, pack=True):
+    """
+    여러 줄을 Papago 글자 수 제한 안에서 최대한 묶어서 번역.
+    pack=False면 줄마다 따로 요청한다. 번역 메모리에 있는 줄은 요청하지 않는다.
+    요청(chunk)들은 스레드 풀에서 동시에 보내고 (rate limiter로 QPS 제한),
+    결과는 texts와 같은 순서의 리스트. 실패한 줄은 원문 그대로 돌려준다.
+    """
+    max_chars = max_chars or PAPAGO_MAX_CHARS
+    results = [None] * len(texts)
+
+    # 번역 메모리에 있는 줄은 요청하지 않음
+    misses = []
+    for i, t in enumerate(texts):
+        cached = _cache_get(t, source, target)
+        if cached is None:
+            misses.append(i)
+        else:
+            results[i] = cached
+
+    # 구분자를 포함하거나 혼자서 제한을 넘는 줄은 묶지 않고 따로 보냄
+    if pack:
+        packable = [
+            i for i in misses
+            if BATCH_DELIMITER not in texts[i] and len(texts[i]) <= max_chars
+        ]
+    else:
+        packable = []
+    packable_set = set(packable)
+
+    chunks = _pack_chunks(texts, packable, max_chars)
+    chunks += [[i] for i in misses if i not in packable_set]
+
+    chunk_results = _executor.map(
+        lambda chunk: _translate_chunk(texts, chunk, source, target), chunks
+    )
+    for chunk, translated in zip(chunks, chunk_results):
+        for i, t in zip(chunk, translated):
+            results[i] = t
+
+    return results
@@ -0,0 +1,79 @@
+"""
+스트리밍 PNG 인코더.
+
+세로로 아주 긴 웹툰 이미지를 한 번에 PIL로 save 하지 않고,
+가로 띠(tile) 단위 행(row)들을 받아서 바로 zlib 압축 → IDAT chunk로 내보낸다.
+fp 는 write()만 있으면 됨 (예: S3MultipartWriter).
+
+행 필터는 PNG "Up"(type 2) 고정: 위 행과의 차이만 저장 (NumPy로 띠 단위 계산).
+"""
+import zlib
+import struct
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_COLOR_TYPES = {"L": (0, 1), "RGB": (2, 3), "RGBA": (6, 4)}
+_FILTER_UP = 2
+
+
+def _chunk(tag, data):
+    return (
+        struct.pack(">I", len(data)) + tag + data
+        + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    )
+
+
+class PngStreamWriter:
+
+    def __init__(self, fp, width, height, mode="RGB", level=6, chunk_size=1 << 20):
+        if mode not in _COLOR_TYPES:
+            raise ValueError(f"unsupported mode: {mode}")
+        color_type, self.channels = _COLOR_TYPES[mode]
+
+        self.fp = fp
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+
+        self._rows = 0
+        self._prev = np.zeros((width * self.channels,), dtype=np.uint8)
+        self._compress = zlib.compressobj(level)
+        self._pending = bytearray()
+
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+        self.fp.write(PNG_SIGNATURE + _chunk(b"IHDR", ihdr))
+
+    def write_rows(self, rows):
+        """rows: (h, width, channels) 또는 (h, width) uint8 배열"""
+        rows = np.ascontiguousarray(rows, dtype=np.uint8).reshape(len(rows), -1)
+        if rows.shape[1] != self.width * self.channels:
+            raise ValueError("row width mismatch")
+        if self._rows + len(rows) > self.height:
+            raise ValueError("too many rows")
+
+        # Up 필터: 각 행 - 바로 위 행 (mod 256)
+        above = np.vstack([self._prev[None, :], rows[:-1]])
+        filtered = rows - above                    # uint8 연산이라 자동으로 mod 256
+        self._prev = rows[-1].copy()
+
+        out = np.empty((len(rows), rows.shape[1] + 1), dtype=np.uint8)
+        out[:, 0] = _FILTER_UP
+        out[:, 1:] = filtered
+
+        self._pending += self._compress.compress(out.tobytes())
+        self._rows += len(rows)
+        self._flush_idat()
+
+    def _flush_idat(self, final=False):
+        while len(self._pending) >= self.chunk_size or (final and self._pending):
+            data = bytes(self._pending[:self.chunk_size])
+            del self._pending[:self.chunk_size]
+            self.fp.write(_chunk(b"IDAT", data))
+
+    def close(self):
+        if self._rows != self.height:
+            raise ValueError(f"expected {self.height} rows, got {self._rows}")
+        self._pending += self._compress.flush()
+        self._flush_idat(final=True)
+        self.fp.write(_chunk(b"IEND", b""))
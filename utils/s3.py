@@ -1,32 +1,107 @@
-import boto3
-import io
-import json
 import os
-from dotenv import load_dotenv
-load_dotenv()
+import gzip
+import json
+from utils.s3_client import get_s3_client, S3_BUCKET
+from utils.blob_cache import blob_cache
+from utils.mask import encode_mask_png
 
-s3 = boto3.client("s3")
-BUCKET_NAME = os.environ.get("S3_BUCKET")
+s3 = get_s3_client()
+BUCKET_NAME = S3_BUCKET
+
+# JSON 저장 시 공백 없는 compact + gzip (Content-Encoding: gzip → 브라우저는 그대로 풀어서 읽음)
+JSON_GZIP = os.environ.get("JSON_GZIP", "1") != "0"
+JSON_GZIP_LEVEL = int(os.environ.get("JSON_GZIP_LEVEL", "6"))
+GZIP_MAGIC = b"\x1f\x8b"
 
 def upload_json_to_s3(data, key):
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=key,
-        Body=json.dumps(data, ensure_ascii=False, indent=2),
-        ContentType="application/json"
-    )
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if JSON_GZIP:
+        blob_cache.put(
+            key,
+            gzip.compress(body, compresslevel=JSON_GZIP_LEVEL, mtime=0),
+            "application/json",
+            ContentEncoding="gzip"
+        )
+    else:
+        blob_cache.put(key, body, "application/json")
     return f"https://{BUCKET_NAME}.s3.amazonaws.com/{key}"
 
+def get_json_bytes(key):
+    """S3 JSON 원문 바이트 (gzip으로 저장된 것이면 풀어서). 예전 indent=2 JSON도 그대로 읽힘"""
+    data = blob_cache.get_bytes(key)
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    return data
+
+def load_json(key):
+    return json.loads(get_json_bytes(key))
+
 def upload_mask_to_s3(mask_image, key):
-    buffer = io.BytesIO()
-    mask_image.save(buffer, format="PNG")
-    buffer.seek(0)
-
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=key,
-        Body=buffer,
-        ContentType="image/png"
-    )
+    blob_cache.put(key, encode_mask_png(mask_image), "image/png")
     
     return f"https://{BUCKET_NAME}.s3.amazonaws.com/{key}"
+
+
+class S3MultipartWriter:
+    """
+    write()로 받은 바이트를 part_size 단위로 S3 multipart upload 하는 file-like 객체.
+    큰 결과 이미지를 메모리에 통째로 만들지 않고 바로 S3로 흘려보낼 때 사용.
+
+        with S3MultipartWriter(key, "image/png") as f:
+            f.write(...)
+    """
+
+    MIN_PART_SIZE = 5 * 1024 * 1024    # S3 제한 (마지막 part 제외)
+
+    def __init__(self, key, content_type, part_size=8 * 1024 * 1024):
+        self.key = key
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self._buf = bytearray()
+        self._parts = []
+        self._upload_id = s3.create_multipart_upload(
+            Bucket=BUCKET_NAME, Key=key, ContentType=content_type
+        )["UploadId"]
+
+    def write(self, data):
+        self._buf += data
+        while len(self._buf) >= self.part_size:
+            self._upload_part(bytes(self._buf[:self.part_size]))
+            del self._buf[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, data):
+        number = len(self._parts) + 1
+        res = s3.upload_part(
+            Bucket=BUCKET_NAME,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=number,
+            Body=data
+        )
+        self._parts.append({"ETag": res["ETag"], "PartNumber": number})
+
+    def close(self):
+        if self._buf or not self._parts:
+            self._upload_part(bytes(self._buf))
+            self._buf = bytearray()
+        s3.complete_multipart_upload(
+            Bucket=BUCKET_NAME,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts}
+        )
+        # 같은 key를 캐시에서 읽고 있었다면 새 버전으로 다시 받도록
+        blob_cache.invalidate(self.key)
+
+    def abort(self):
+        s3.abort_multipart_upload(Bucket=BUCKET_NAME, Key=self.key, UploadId=self._upload_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
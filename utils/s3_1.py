@@ -1,30 +1,12 @@
-import boto3
 import json
-import os
-from dotenv import load_dotenv
-load_dotenv()
+from utils.s3_client import get_s3_client, extract_s3_key, S3_BUCKET, AWS_REGION
+from utils.s3 import load_json
 
-
-S3_BUCKET = os.environ.get("S3_BUCKET")
-AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
-
-s3 = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY")
-  )
-
-def extract_s3_key(url: str):
-    after = url.split(".amazonaws.com/", 1)[1]
-    key = after.split("?", 1)[0]
-    return key
+s3 = get_s3_client()
 
 def load_json_from_s3(url: str):
-    key = extract_s3_key(url)
-    obj = s3.get_object(Bucket=S3_BUCKET, Key=key)
-    body = obj["Body"].read().decode("utf-8")
-    return json.loads(body)
+    # gzip(Content-Encoding)으로 저장된 JSON도 풀어서 읽음
+    return load_json(extract_s3_key(url))
 
 def save_json_to_s3(data, original_image_url):
     file_name = original_image_url.split("/")[-1]
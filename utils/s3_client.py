@@ -0,0 +1,60 @@
+"""
+공용 S3 클라이언트.
+
+모든 서비스/라우터가 이 모듈의 클라이언트 하나를 같이 쓴다.
+boto3 client는 thread-safe 하므로 멀티스레드 WSGI 서버에서도 그대로 재사용 가능
+(session은 thread-safe 하지 않으므로 생성은 lock 안에서 한 번만).
+"""
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+load_dotenv()
+
+S3_BUCKET = os.environ.get("S3_BUCKET")
+AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2")
+
+# 커넥션 풀 크기 = 동시에 S3를 쓰는 스레드 수 이상으로
+S3_MAX_POOL_CONNECTIONS = int(os.environ.get("S3_MAX_POOL_CONNECTIONS", "50"))
+S3_MAX_ATTEMPTS = int(os.environ.get("S3_MAX_ATTEMPTS", "5"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                session = boto3.session.Session(
+                    aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
+                    aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
+                    region_name=AWS_REGION
+                )
+                _client = session.client(
+                    "s3",
+                    config=Config(
+                        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=True,
+                        connect_timeout=5,
+                        read_timeout=60,
+                        retries={"max_attempts": S3_MAX_ATTEMPTS, "mode": "adaptive"}
+                    )
+                )
+    return _client
+
+
+def extract_s3_key(url: str):
+    """https://{bucket}.s3.{region}.amazonaws.com/{key}?... → {key}"""
+    after = url.split(".amazonaws.com/", 1)[1]
+    return after.split("?", 1)[0]
+
+
+
+def is_not_found(e):
+    """get_object 에서 key가 없어서 난 ClientError 인지."""
+    code = getattr(e, "response", {}).get("Error", {}).get("Code")
+    return code in ("NoSuchKey", "404", "NotFound")
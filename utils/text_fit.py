@@ -0,0 +1,138 @@
+"""
+번역문 텍스트 맞춤 (박스 안에 들어가는 가장 큰 폰트 크기 + 줄바꿈 계산).
+
+- ImageFont는 (폰트 경로, 크기)별로 한 번만 로드 (lru_cache)
+- 글자 폭(advance)은 (폰트, 크기)별 dict에 memo → 같은 글자는 다시 재지 않음
+- 폰트 크기는 이진 탐색, 각 크기마다 greedy 줄바꿈 (공백 우선, 안 되면 글자 단위)
+- 높이: 첫 줄은 글자 크기 그대로, 줄 간격(LINE_HEIGHT)은 줄 사이에만 적용
+  (OCR 박스는 글자 높이에 딱 맞는 한 줄이라 한 줄짜리에 행간을 붙이면 맞는 글자도 줄어듦)
+"""
+import os
+import threading
+from functools import lru_cache
+
+from PIL import ImageFont
+
+FONT_PATH = os.environ.get("REINSERT_FONT_PATH", "/usr/share/fonts/truetype/nanum/NanumGothic.ttf")
+LINE_HEIGHT = float(os.environ.get("REINSERT_LINE_HEIGHT", "1.2"))
+MIN_FONT_SIZE = int(os.environ.get("REINSERT_MIN_FONT_SIZE", "12"))
+
+_advance_tables = {}            # (font_path, size) -> {char: advance}
+_advance_lock = threading.Lock()
+
+
+@lru_cache(maxsize=512)
+def get_font(font_path, size):
+    return ImageFont.truetype(font_path, size)
+
+
+@lru_cache(maxsize=None)
+def font_available(font_path):
+    try:
+        ImageFont.truetype(font_path, MIN_FONT_SIZE)
+        return True
+    except OSError as e:
+        print("[text_fit] font not available, skip fitting:", e)
+        return False
+
+
+def _advance_table(font_path, size):
+    key = (font_path, size)
+    table = _advance_tables.get(key)
+    if table is None:
+        with _advance_lock:
+            table = _advance_tables.setdefault(key, {})
+    return table
+
+
+def text_width(text, font_path, size):
+    table = _advance_table(font_path, size)
+    width = 0.0
+    for ch in text:
+        adv = table.get(ch)
+        if adv is None:
+            adv = get_font(font_path, size).getlength(ch)
+            table[ch] = adv
+        width += adv
+    return width
+
+
+def wrap_text(text, font_path, size, max_width):
+    """
+    max_width 안에 들어가도록 greedy 줄바꿈.
+    공백에서 먼저 끊고, 한 단어가 너무 길면(또는 공백 없는 CJK) 글자 단위로 끊음.
+    글자 하나도 안 들어가면 None.
+    """
+    def width(s):
+        return text_width(s, font_path, size)
+
+    lines = []
+
+    for paragraph in text.split("\n"):
+        cur, cur_w = "", 0.0
+        space_w = width(" ")
+
+        for word in paragraph.split(" "):
+            word_w = width(word)
+            add_w = word_w + (space_w if cur else 0)
+
+            if cur_w + add_w <= max_width:
+                cur = f"{cur} {word}" if cur else word
+                cur_w += add_w
+                continue
+
+            if cur and word_w <= max_width:
+                lines.append(cur)
+                cur, cur_w = word, word_w
+                continue
+
+            # 단어가 한 줄보다 길면 글자 단위로 이어 붙이며 끊기
+            if cur:
+                cur += " "
+                cur_w += space_w
+            for ch in word:
+                ch_w = width(ch)
+                if ch_w > max_width:
+                    return None
+                if cur_w + ch_w > max_width:
+                    lines.append(cur.rstrip())
+                    cur, cur_w = "", 0.0
+                cur += ch
+                cur_w += ch_w
+
+        lines.append(cur)
+
+    return lines
+
+
+def _text_height(n_lines, size):
+    return size + (n_lines - 1) * size * LINE_HEIGHT
+
+
+def fit_text(text, box_width, box_height, max_size, min_size=None, font_path=None):
+    """
+    box 안에 들어가는 가장 큰 폰트 크기와 줄바꿈 결과: (font_size, lines)
+    max_size 보다 크게는 키우지 않고, min_size에서도 안 들어가면 min_size로 (넘치는 채로) 반환.
+    """
+    font_path = font_path or FONT_PATH
+    min_size = min_size or MIN_FONT_SIZE
+    max_size = max(min_size, int(max_size))
+
+    if not font_available(font_path):
+        return max_size, [text]
+
+    best = None
+    lo, hi = min_size, max_size
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        lines = wrap_text(text, font_path, mid, box_width)
+        if lines is not None and _text_height(len(lines), mid) <= box_height:
+            best = (mid, lines)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    if best is None:
+        lines = wrap_text(text, font_path, min_size, box_width) or [text]
+        best = (min_size, lines)
+    return best
@@ -0,0 +1,161 @@
+"""
+번역 메모리 (Papago 결과 캐시).
+
+1단계: 프로세스 내 LRU (OrderedDict)
+2단계: 로컬 SQLite 파일 (서버 재시작 / 여러 프로젝트 간 공유)
+
+key = sha256(source, target, 정규화된 원문)
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+TRANSLATION_CACHE_ENABLED = os.environ.get("TRANSLATION_CACHE", "1") != "0"
+TRANSLATION_CACHE_DB = os.environ.get(
+    "TRANSLATION_CACHE_DB", "/tmp/chowol_translation_cache.sqlite3"
+)
+TRANSLATION_CACHE_TTL = int(os.environ.get("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))
+TRANSLATION_CACHE_MEMORY_SIZE = int(os.environ.get("TRANSLATION_CACHE_MEMORY_SIZE", "5000"))
+TRANSLATION_CACHE_MAX_ROWS = int(os.environ.get("TRANSLATION_CACHE_MAX_ROWS", "200000"))
+
+# 이 횟수만큼 저장할 때마다 만료/초과 row 정리
+_EVICT_EVERY = 500
+
+
+def normalize_text(text):
+    # 유니코드 정규화(NFC) + 공백 정리
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+
+def cache_key(text, source, target):
+    raw = f"{source}\x00{target}\x00{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+
+    def __init__(self, db_path, ttl, memory_size, max_rows):
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+
+        self._memory = OrderedDict()   # key -> (translated, expires_at)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                source TEXT,
+                target TEXT,
+                text TEXT,
+                translated TEXT,
+                created_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_translations_accessed ON translations (accessed_at)"
+        )
+        self._db.commit()
+
+    def _remember(self, key, translated, expires_at):
+        self._memory[key] = (translated, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, text, source, target):
+        key = cache_key(text, source, target)
+        now = time.time()
+
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                if hit[1] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return hit[0]
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT translated, created_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and row[1] + self.ttl > now:
+                self._db.execute(
+                    "UPDATE translations SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self._db.commit()
+                self._remember(key, row[0], row[1] + self.ttl)
+                self._stats["disk_hits"] += 1
+                return row[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, text, source, target, translated):
+        key = cache_key(text, source, target)
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, translated, now + self.ttl)
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, source, target, normalize_text(text), translated, now, now)
+            )
+            self._db.commit()
+
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(now)
+
+    def _evict(self, now):
+        # TTL 지난 row 삭제 후, 그래도 많으면 오래 안 쓰인 순으로 삭제
+        self._db.execute("DELETE FROM translations WHERE created_at < ?", (now - self.ttl,))
+        count = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if count > self.max_rows:
+            self._db.execute(
+                """
+                DELETE FROM translations WHERE key IN (
+                    SELECT key FROM translations ORDER BY accessed_at ASC LIMIT ?
+                )
+                """,
+                (count - self.max_rows,)
+            )
+        self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = self._db.execute(
+                "SELECT COUNT(*) FROM translations"
+            ).fetchone()[0]
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+translation_cache = None
+if TRANSLATION_CACHE_ENABLED:
+    try:
+        translation_cache = TranslationCache(
+            TRANSLATION_CACHE_DB,
+            TRANSLATION_CACHE_TTL,
+            TRANSLATION_CACHE_MEMORY_SIZE,
+            TRANSLATION_CACHE_MAX_ROWS,
+        )
+    except Exception as e:
+        print("[translation_cache] WARNING: failed to open cache:", e)
@@ -0,0 +1,104 @@
+"""
+Google Vision 클라이언트 생성.
+
+VISION_FAKE=1 이면 네트워크/인증 없이 동작하는 가짜 클라이언트를 돌려준다 (오프라인 테스트용).
+가짜 클라이언트는 이미지 크기만 보고 VISION_FAKE_LINE_GAP 간격마다
+"FAKE OCR" 한 줄을 만들어서 진짜 Vision 응답과 같은 타입(AnnotateImageResponse)으로 반환한다.
+"""
+import io
+import os
+import threading
+
+from google.cloud import vision
+from PIL import Image
+
+VISION_FAKE = os.environ.get("VISION_FAKE", "0") == "1"
+VISION_FAKE_LINE_GAP = int(os.environ.get("VISION_FAKE_LINE_GAP", "400"))
+VISION_FAKE_TEXT = os.environ.get("VISION_FAKE_TEXT", "FAKE OCR")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _poly(x0, y0, x1, y1):
+    return vision.BoundingPoly(vertices=[
+        vision.Vertex(x=x0, y=y0), vision.Vertex(x=x1, y=y0),
+        vision.Vertex(x=x1, y=y1), vision.Vertex(x=x0, y=y1),
+    ])
+
+
+class FakeVisionClient:
+    """text_detection / batch_annotate_images 만 흉내냄"""
+
+    CHAR_W = 20
+    CHAR_H = 24
+
+    def _annotate(self, content):
+        width, height = Image.open(io.BytesIO(content)).size
+        Break = vision.TextAnnotation.DetectedBreak.BreakType
+
+        blocks, entities, lines = [], [], []
+        for top in range(VISION_FAKE_LINE_GAP // 2, height - self.CHAR_H, VISION_FAKE_LINE_GAP):
+            words = []
+            x = 10
+            for w_idx, word in enumerate(VISION_FAKE_TEXT.split()):
+                if x + len(word) * self.CHAR_W > width:
+                    break
+                last_word = w_idx == len(VISION_FAKE_TEXT.split()) - 1
+                symbols = []
+                for c_idx, ch in enumerate(word):
+                    sx = x + c_idx * self.CHAR_W
+                    brk = None
+                    if c_idx == len(word) - 1:
+                        brk = Break.LINE_BREAK if last_word else Break.SPACE
+                    symbols.append(vision.Symbol(
+                        text=ch,
+                        bounding_box=_poly(sx, top, sx + self.CHAR_W, top + self.CHAR_H),
+                        property=vision.TextAnnotation.TextProperty(
+                            detected_break=vision.TextAnnotation.DetectedBreak(type_=brk)
+                        ) if brk else None,
+                    ))
+                x1 = x + len(word) * self.CHAR_W
+                words.append(vision.Word(symbols=symbols, bounding_box=_poly(x, top, x1, top + self.CHAR_H)))
+                entities.append(vision.EntityAnnotation(
+                    description=word, bounding_poly=_poly(x, top, x1, top + self.CHAR_H)
+                ))
+                x = x1 + self.CHAR_W
+            if words:
+                lines.append(" ".join("".join(s.text for s in w.symbols) for w in words))
+                blocks.append(vision.Block(paragraphs=[vision.Paragraph(words=words)]))
+
+        text = "".join(line + "\n" for line in lines)
+        if entities:
+            entities.insert(0, vision.EntityAnnotation(description=text, locale="en"))
+
+        page = vision.Page(
+            width=width,
+            height=height,
+            blocks=blocks,
+            property=vision.TextAnnotation.TextProperty(
+                detected_languages=[vision.TextAnnotation.DetectedLanguage(language_code="en")]
+            ),
+        )
+        return vision.AnnotateImageResponse(
+            text_annotations=entities,
+            full_text_annotation=vision.TextAnnotation(pages=[page], text=text),
+        )
+
+    def text_detection(self, image, **kwargs):
+        return self._annotate(image.content)
+
+    def batch_annotate_images(self, requests, **kwargs):
+        return vision.BatchAnnotateImagesResponse(
+            responses=[self._annotate(req.image.content) for req in requests]
+        )
+
+
+def get_vision_client():
+    """프로세스 전체에서 공유하는 Vision 클라이언트 (VISION_FAKE=1 이면 가짜)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FakeVisionClient() if VISION_FAKE else vision.ImageAnnotatorClient()
+    return _client